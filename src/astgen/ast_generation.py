@@ -11,29 +11,183 @@ into Abstract Syntax Trees using the visitor pattern.
 # Date: October 27th, 2025
 
 
-from functools import reduce
+from functools import lru_cache
+from antlr4.tree.Tree import TerminalNode
 from build.OPLangVisitor import OPLangVisitor
 from build.OPLangParser import OPLangParser
 from src.utils.nodes import *
 
 
+# Shared leaf nodes: nodes are never mutated after construction, so identical
+# primitives and names can be reused instead of allocated per occurrence
+_INT = PrimitiveType("int")
+_FLOAT = PrimitiveType("float")
+_BOOL = PrimitiveType("boolean")
+_STR = PrimitiveType("string")
+_VOID = PrimitiveType("void")
+_NIL = NilLiteral()
+_CONTINUE = ContinueStatement()
+_BREAK = BreakStatement()
+
+# Token type -> primitive type, for rules that start with a type keyword
+_PRIMITIVE_BY_TOKEN = {
+    OPLangParser.INT: _INT,
+    OPLangParser.FLOAT: _FLOAT,
+    OPLangParser.BOOLEAN: _BOOL,
+    OPLangParser.STRING: _STR,
+    OPLangParser.VOID: _VOID,
+}
+
+# Precedence levels whose single-child alternative just returns the child's AST
+_PASS_THROUGH_RULES = frozenset({
+    OPLangParser.RULE_relationexpr,
+    OPLangParser.RULE_equalityexpr,
+    OPLangParser.RULE_andorexpr,
+    OPLangParser.RULE_addsubexpr,
+    OPLangParser.RULE_muldivexpr,
+    OPLangParser.RULE_concatexpr,
+    OPLangParser.RULE_unaryexpr,
+    OPLangParser.RULE_postfix,
+})
+
+# Single-token primary alternatives: token type -> node builder taking the token text
+_PRIMARY_BY_TOKEN = {
+    OPLangParser.INTEGER_LITERAL: lambda text: IntLiteral(_int_of(text)),
+    OPLangParser.FLOAT_LITERAL: lambda text: FloatLiteral(float(text)),
+    OPLangParser.STRING_LITERAL: lambda text: StringLiteral(text),
+    OPLangParser.BOOLEAN_LITERAL: lambda text: BoolLiteral(text == "true"),
+    OPLangParser.ID: lambda text: _ident(text),
+    OPLangParser.THIS: lambda text: ThisExpression(),
+    OPLangParser.NIL: lambda text: _NIL,
+}
+
+# visitXxx name for each rule index, resolved once per process rather than per ASTGeneration
+_RULE_VISITOR_NAMES = tuple("visit" + name[0].upper() + name[1:] for name in OPLangParser.ruleNames)
+
+
+@lru_cache(maxsize=4096)
+def _int_of(text):
+    return int(text)
+
+
+# Leaf nodes are interned (see ASTNode): one Identifier/MemberAccess/ClassType per name,
+# shared by every tree; bounded so a long-lived process does not keep every name it has seen
+@lru_cache(maxsize=4096)
+def _ident(name):
+    return Identifier(name)
+
+
+@lru_cache(maxsize=4096)
+def _mem(name):
+    return MemberAccess(name)
+
+
+@lru_cache(maxsize=4096)
+def _classtype(name):
+    return ClassType(name)
+
+
 class ASTGeneration(OPLangVisitor):
+    def __init__(self):
+        super().__init__()
+        # rule index -> bound visitXxx, so visiting a node is one dict hit instead of ctx.accept()
+        self._table = {index: getattr(self, name) for index, name in enumerate(_RULE_VISITOR_NAMES)}
+
+    def dispatch(self, ctx):
+        # Tokens (and a missing child, which should still fail as it always has) go through accept
+        if ctx is None or isinstance(ctx, TerminalNode):
+            return ctx.accept(self)
+        return self._table[ctx.getRuleIndex()](ctx)
+
+    visit = dispatch
+
+    # Same aggregation as ParseTreeVisitor.visitChildren, but children go through dispatch:
+    # labeled alternatives (lhs, callexpr) would otherwise accept() into OPLangVisitor's
+    # per-label defaults instead of visitLhs / visitCallexpr
+    def visitChildren(self, node):
+        result = None
+        for i in range(node.getChildCount()):
+            result = self.visit(node.getChild(i))
+        return result
+
+    # Helper: dispatch on the rule of the first child instead of probing every alternative
+    def _dispatch_first(self, ctx, table):
+        first = ctx.getChild(0)
+        if first is None or isinstance(first, TerminalNode):
+            return None
+        handler = table.get(first.getRuleIndex())
+        return handler(self, first) if handler else None
+
+    # Helper: visit an expression level, jumping straight past pass-through levels
+    # (a literal operand sits under eight single-child contexts otherwise)
+    def _visit_operand(self, ctx):
+        while ctx is not None and ctx.getChildCount() == 1 and \
+                not isinstance(ctx, TerminalNode) and ctx.getRuleIndex() in _PASS_THROUGH_RULES:
+            ctx = ctx.getChild(0)
+        return self.visit(ctx)
+
+    # Helper: for left-recursive operator levels (x op y op z ...), unwind to the
+    # leftmost operand, then fold BinaryOps left to right; no Python frame per operator.
+    # Operator tokens' text is already the AST spelling (&&, ||, +, -, *, /, \, %, ^)
+    def _fold_left(self, ctx):
+        tail = []
+        while ctx.getChildCount() == 3:
+            tail.append((ctx.getChild(1).getText(), ctx.getChild(2)))
+            ctx = ctx.getChild(0)
+        node = self._visit_operand(ctx.getChild(0))
+        for operator, rhs in reversed(tail):
+            node = BinaryOp(node, operator, self._visit_operand(rhs))
+        return node
+
+    # Helper: visit an optional/list-valued child, skipping the call when it is absent or empty
+    def _visit_or_empty(self, ctx):
+        if ctx is None or ctx.getChildCount() == 0:
+            return []
+        return self.visit(ctx) or []
+
+    # Helper: index a context's children in one pass: first token per token type,
+    # and rule contexts grouped by rule index (what ctx.ID() / ctx.expr() would each rescan for)
+    @staticmethod
+    def _index_children(ctx):
+        tokens, rules = {}, {}
+        for child in ctx.children or ():
+            if isinstance(child, TerminalNode):
+                tokens.setdefault(child.symbol.type, child)
+            else:
+                rules.setdefault(child.getRuleIndex(), []).append(child)
+        return tokens, rules
+
+    # Helper: split a statement list into (variable decls, statements) in one pass
+    @staticmethod
+    def _partition(nodes):
+        var_decls, stmts = [], []
+        add_decl, add_stmt, decl_cls = var_decls.append, stmts.append, VariableDecl
+        for n in nodes:
+            if n.__class__ is decl_cls:
+                add_decl(n)
+            else:
+                add_stmt(n)
+        return var_decls, stmts
+
     # program: classdecllist EOF;
     def visitProgram(self, ctx: OPLangParser.ProgramContext):
         return Program(self.visit(ctx.classdecllist()))
 
     # classdecllist: classdecl classdecllist | classdecl;
     def visitClassdecllist(self, ctx: OPLangParser.ClassdecllistContext):
-        if ctx.classdecllist():
-            return [self.visit(ctx.classdecl())] + self.visit(ctx.classdecllist())
-        else:
-            return [self.visit(ctx.classdecl())]
+        classes = []
+        while ctx is not None:
+            classes.append(self.visit(ctx.classdecl()))
+            ctx = ctx.classdecllist()
+        return classes
 
     # classdecl: CLASS ID memberprime LBRACE memberlist RBRACE;
     def visitClassdecl(self, ctx: OPLangParser.ClassdeclContext):
         classname = ctx.ID().getText()
-        superclass = self.visit(ctx.memberprime()) if ctx.memberprime() else None
-        members = self.visit(ctx.memberlist()) if ctx.memberlist() else []
+        memberprime = ctx.memberprime()
+        memberlist = ctx.memberlist()
+        superclass = self.visit(memberprime) if memberprime else None
+        members = self.visit(memberlist) if memberlist else []
         return ClassDecl(classname, superclass, members)
 
     # memberprime: EXTENDS ID |;
@@ -46,21 +200,15 @@ class ASTGeneration(OPLangVisitor):
         # memberlist: member memberlist | ;
 
     def visitMemberlist(self, ctx: OPLangParser.MemberlistContext):
-        if ctx.getChildCount() == 0:
-            return []
-        else:
-            return [self.visit(ctx.member())] + self.visit(ctx.memberlist())
+        members = []
+        while ctx.getChildCount() != 0:
+            members.append(self.visit(ctx.member()))
+            ctx = ctx.memberlist()
+        return members
 
     # member: attridecl | methoddecl | constructor | destructor;
     def visitMember(self, ctx: OPLangParser.MemberContext):
-        if ctx.attridecl():
-            return self.visit(ctx.attridecl())
-        elif ctx.methoddecl():
-            return self.visit(ctx.methoddecl())
-        elif ctx.constructor():
-            return self.visit(ctx.constructor())
-        elif ctx.destructor():
-            return self.visit(ctx.destructor())
+        return self._dispatch_first(ctx, self._MEMBER_DISPATCH)
 
     # staticfinal: STATIC | FINAL | STATIC FINAL| FINAL STATIC |;
     def visitStaticfinal(self, ctx: OPLangParser.StaticfinalContext):
@@ -70,12 +218,7 @@ class ASTGeneration(OPLangVisitor):
 
     # constructor: defaultconstructor | copyconstructor | userdefinedconstructor ;
     def visitConstructor(self, ctx: OPLangParser.ConstructorContext):
-        if ctx.defaultconstructor():
-            return self.visit(ctx.defaultconstructor())
-        elif ctx.copyconstructor():
-            return self.visit(ctx.copyconstructor())
-        elif ctx.userdefinedconstructor():
-            return self.visit(ctx.userdefinedconstructor())
+        return self._dispatch_first(ctx, self._CONSTRUCTOR_DISPATCH)
 
     # defaultconstructor: ID LB RB body;
     def visitDefaultconstructor(self, ctx: OPLangParser.DefaultconstructorContext):
@@ -89,7 +232,7 @@ class ASTGeneration(OPLangVisitor):
         name = ctx.ID(0).getText()
         param_name = ctx.ID(2).getText()
         param_type_name = ctx.ID(1).getText()
-        param_type = ClassType(param_type_name)
+        param_type = _classtype(param_type_name)
         param = Parameter(param_type, param_name)
         params = [param]
         body = self.visit(ctx.body())
@@ -110,14 +253,15 @@ class ASTGeneration(OPLangVisitor):
 
     # methoddecl: staticfinal returntype ID LB paramlist RB body;
     def visitMethoddecl(self, ctx: OPLangParser.MethoddeclContext):
-        if ctx.staticfinal():
-            is_static, _ = self.visit(ctx.staticfinal())
+        staticfinal = ctx.staticfinal()
+        if staticfinal:
+            is_static, _ = self.visit(staticfinal)
         else:
             is_static = False
 
         return_type = self.visit(ctx.returntype())
         name = ctx.ID().getText()
-        params = self.visit(ctx.paramlist()) or []
+        params = self._visit_or_empty(ctx.paramlist())
         body = self.visit(ctx.body())
         return MethodDecl(is_static, return_type, name, params, body)
 
@@ -125,8 +269,7 @@ class ASTGeneration(OPLangVisitor):
     def visitBody(self, ctx: OPLangParser.BodyContext):
         if ctx.LBRACE() and ctx.RBRACE():
             nodes = self.visit(ctx.stmtlist()) if ctx.stmtlist() else []
-            vars_decls = [n for n in nodes if isinstance(n, VariableDecl)]
-            stmts = [n for n in nodes if not isinstance(n, VariableDecl)]
+            vars_decls, stmts = self._partition(nodes)
             return BlockStatement(vars_decls, stmts)
 
     # paramlist: paramprime |;
@@ -138,10 +281,11 @@ class ASTGeneration(OPLangVisitor):
 
     # paramprime: param SEMI paramprime | param;
     def visitParamprime(self, ctx: OPLangParser.ParamprimeContext):
-        if ctx.paramprime():
-            return (self.visit(ctx.param()) or []) + (self.visit(ctx.paramprime()) or [])
-        else:
-            return self.visit(ctx.param()) or []
+        params = []
+        while ctx is not None:
+            params.extend(self._visit_or_empty(ctx.param()))
+            ctx = ctx.paramprime()
+        return params
 
     # param: (attritype | objectarrtype) (AMP | ) idlist;
     # Parameter() in nodes.py
@@ -155,70 +299,58 @@ class ASTGeneration(OPLangVisitor):
         if ctx.AMP():
             param_type = ReferenceType(param_type)
 
-        ids = self.visit(ctx.idlist()) or []
-        return [Parameter(param_type, name.name if isinstance(name, Identifier) else name) for name in ids]
+        ids = self._visit_or_empty(ctx.idlist())
+        return [Parameter(param_type, name) for name in ids]
 
     # idlist: ID COMMA idlist | ID;.
     def visitIdlist(self, ctx: OPLangParser.IdlistContext):
-        if ctx.ID():
-            return [Identifier(ctx.ID().getText())]
-        else:
-            return [Identifier(ctx.ID().getText())] + self.visit(ctx.idlist())
+        ids = []
+        while ctx is not None:
+            ids.append(ctx.ID().getText())
+            ctx = ctx.idlist()
+        return ids
 
     # stmtlist: stmt stmtlist |;
     def visitStmtlist(self, ctx: OPLangParser.StmtlistContext):
-        if ctx.getChildCount() == 0:
-            return []
-        else:
-            return [self.visit(ctx.stmt())] + (self.visit(ctx.stmtlist()) + [])
+        stmts = []
+        while ctx.getChildCount() != 0:
+            stmts.append(self.visit(ctx.stmt()))
+            ctx = ctx.stmtlist()
+        return stmts
 
     # stmt: vardef | returnstmt | ifstmt | forstmt
     #              | continuestmt | breakstmt | reftype
     #              | assignstmt | attritype AMP ID SEMI | callexpr SEMI
     #              | body;
     def visitStmt(self, ctx: OPLangParser.StmtContext):
-        if ctx.vardef():
-            return self.visit(ctx.vardef())
-        elif ctx.returnstmt():
-            return self.visit(ctx.returnstmt())
-        elif ctx.ifstmt():
-            return self.visit(ctx.ifstmt())
-        elif ctx.forstmt():
-            return self.visit(ctx.forstmt())
-        elif ctx.continuestmt():
-            return self.visit(ctx.continuestmt())
-        elif ctx.breakstmt():
-            return self.visit(ctx.breakstmt())
-        elif ctx.reftype():
-            return self.visit(ctx.reftype())
-        elif ctx.assignstmt():
-            return self.visit(ctx.assignstmt())
-        elif ctx.attritype():
-            var_type = self.visit(ctx.attritype())
+        first = ctx.getChild(0)
+        if isinstance(first, OPLangParser.AttritypeContext):
+            var_type = self.visit(first)
             var_type = ReferenceType(var_type)
             name = ctx.ID().getText()
             return VariableDecl(False, var_type, [Variable(name)])
-        elif ctx.callexpr():
-            return self.visit(ctx.callexpr())
-        elif ctx.body():
-            return self.visit(ctx.body())
+        return self._dispatch_first(ctx, self._STMT_DISPATCH)
 
     #### Xem lại kỹ chỗ này
-    # callexpr: ID
-    # | (ID | THIS) callmethods              // a.foo().goo(a,b), this.foo();
-    # | (ID | THIS) DOT ID callexpr
-    # | (ID | THIS) DOT ID ASSIGN expr       // a.length := expr, this.length := expr;
-    # | (ID | THIS) DOT arrtype
+    # callexpr: ID                                 # callId
+    # | (ID | THIS) callmethods                    # callMethods        // a.foo().goo(a,b), this.foo();
+    # | (ID | THIS) DOT ID callexpr                # callDotChain
+    # | ID DOT ID ASSIGN expr                      # callIdFieldAssign  // a.length := expr
+    # | THIS DOT ID ASSIGN expr                    # callThisFieldAssign
+    # | (ID | THIS) DOT arrtype                    # callDotArrtype
     def visitCallexpr(self, ctx: OPLangParser.CallexprContext):
+        alt = type(ctx)
+
         # Case 1: ID
-        if ctx.ID() and not ctx.callmethods() and not ctx.DOT():
-            return Identifier(ctx.ID().getText())
+        if alt is OPLangParser.CallIdContext:
+            return _ident(ctx.ID().getText())
 
         # Case 2: (ID | THIS) callmethods: io.someMethod
-        if ctx.callmethods():
-            primary = Identifier(ctx.ID(0).getText()) if ctx.ID() else ThisExpression()
+        if alt is OPLangParser.CallMethodsContext:
+            id_node = ctx.ID()
+            primary = _ident(id_node.getText()) if id_node else ThisExpression()
 
-            postfix_ops = self.visit(ctx.callmethods()) or []
+            postfix_ops = self._visit_or_empty(ctx.callmethods())
 
             if isinstance(primary, Identifier) and len(postfix_ops) == 1 and isinstance(postfix_ops[0], MethodCall):
                 class_name = primary.name
@@ -230,9 +362,10 @@ class ASTGeneration(OPLangVisitor):
             return MethodInvocationStatement(PostfixExpression(primary, postfix_ops))
 
         # Case 3: (ID | THIS) DOT ID callexpr
-        if ctx.DOT() and ctx.callexpr() and not ctx.ASSIGN():
-            primary = Identifier(ctx.ID(0).getText()) if ctx.ID(0) else ThisExpression()
-            member = MemberAccess(ctx.ID(1).getText())
+        if alt is OPLangParser.CallDotChainContext:
+            ids = ctx.ID()
+            primary = _ident(ids[0].getText()) if len(ids) > 1 else ThisExpression()
+            member = _mem(ids[-1].getText())
             nested = self.visit(ctx.callexpr())
             # if isinstance(nested,Identifier) and nested.name == ctx.ID(1).getText():
             #     return StaticMemberAccess(primary.name if isinstance(primary, Identifier) else ThisExpression, nested)
@@ -244,25 +377,26 @@ class ASTGeneration(OPLangVisitor):
                 return PostfixExpression(primary, [member])
 
         # Case 4: ID DOT ID ASSIGN expr
-        if ctx.ASSIGN() and ctx.ID() and not ctx.THIS():
-            primary = Identifier(ctx.ID(0).getText())
-            postfix_ops = [MemberAccess(ctx.ID(1).getText())]
+        if alt is OPLangParser.CallIdFieldAssignContext:
+            primary = _ident(ctx.ID(0).getText())
+            postfix_ops = [_mem(ctx.ID(1).getText())]
             lhs = PostfixExpression(primary, postfix_ops)
             rhs = self.visit(ctx.expr())
             return AssignmentStatement(PostfixLHS(lhs), rhs)
         # Case 4.1: THIS DOT ID ASSIGN expr
-        if ctx.THIS() and ctx.THIS():
+        if alt is OPLangParser.CallThisFieldAssignContext:
             primary = ThisExpression()
-            postfix_ops = [MemberAccess(ctx.ID(0).getText())]
+            postfix_ops = [_mem(ctx.ID().getText())]
             lhs = PostfixExpression(primary, postfix_ops)
             rhs = self.visit(ctx.expr())
             return AssignmentStatement(PostfixLHS(lhs), rhs)
 
         # Case 5: (ID | THIS) DOT arrtype
-        if ctx.arrtype():
-            class_name = ctx.ID().getText() if ctx.ID() else ThisExpression()
+        if alt is OPLangParser.CallDotArrtypeContext:
+            id_node = ctx.ID()
+            class_name = id_node.getText() if id_node else ThisExpression()
             member_type = self.visit(ctx.arrtype())
-            return MemberAccess(class_name)
+            return _mem(class_name)
 
         return self.visitChildren(ctx)
 
@@ -281,9 +415,11 @@ class ASTGeneration(OPLangVisitor):
 
     # attrilistprime: attribute COMMA attrilistprime | attribute;
     def visitAttrilistprime(self, ctx: OPLangParser.AttrilistprimeContext):
-        if ctx.attrilistprime():
-            return [self.visit(ctx.attribute())] + self.visit(ctx.attrilistprime())
-        return [self.visit(ctx.attribute())]
+        attributes = []
+        while ctx is not None:
+            attributes.append(self.visit(ctx.attribute()))
+            ctx = ctx.attrilistprime()
+        return attributes
 
     # attribute: (AMP | ) ID ASSIGN expr | (AMP | ) ID ;
     def visitAttribute(self, ctx: OPLangParser.AttributeContext):
@@ -299,7 +435,7 @@ class ASTGeneration(OPLangVisitor):
     def visitVardef(self, ctx: OPLangParser.VardefContext):
         is_final = True if ctx.FINAL() else False
         var_type = self.visit(ctx.attritype())
-        variables = self.visit(ctx.varlist()) or []
+        variables = self._visit_or_empty(ctx.varlist())
         return VariableDecl(is_final, var_type, variables)
 
     # varlist: varlistprime |;
@@ -310,9 +446,11 @@ class ASTGeneration(OPLangVisitor):
 
     # varlistprime: var COMMA varlistprime | var;
     def visitVarlistprime(self, ctx: OPLangParser.VarlistprimeContext):
-        if ctx.COMMA():
-            return [self.visit(ctx.var())] + self.visit(ctx.varlistprime())
-        return [self.visit(ctx.var())]
+        variables = []
+        while ctx is not None:
+            variables.append(self.visit(ctx.var()))
+            ctx = ctx.varlistprime()
+        return variables
 
     # var: (AMP | ) ID (ASSIGN expr | );
     def visitVar(self, ctx: OPLangParser.VarContext):
@@ -325,19 +463,11 @@ class ASTGeneration(OPLangVisitor):
 
     # attritype: (INT | FLOAT | BOOLEAN | STRING) (AMP |) | arrtype | classtype;
     def visitAttritype(self, ctx: OPLangParser.AttritypeContext):
-        if ctx.arrtype():
-            return self.visit(ctx.arrtype())
-        elif ctx.classtype():
-            return self.visit(ctx.classtype())
-        if ctx.INT():
-            primitive_type = PrimitiveType("int")
-        elif ctx.FLOAT():
-            primitive_type = PrimitiveType("float")
-        elif ctx.STRING():
-            primitive_type = PrimitiveType("string")
-        elif ctx.BOOLEAN():
-            primitive_type = PrimitiveType("boolean")
-        if ctx.AMP():
+        first = ctx.getChild(0)
+        if not isinstance(first, TerminalNode):
+            return self._dispatch_first(ctx, self._TYPE_DISPATCH)
+        primitive_type = _PRIMITIVE_BY_TOKEN[first.symbol.type]
+        if ctx.getChildCount() == 2:
             return ReferenceType(primitive_type)
         else:
             return primitive_type
@@ -345,12 +475,12 @@ class ASTGeneration(OPLangVisitor):
     # returntype: attritype (AMP | ) | VOID;
     def visitReturntype(self, ctx: OPLangParser.ReturntypeContext):
         if ctx.VOID():
-            return PrimitiveType("void")
+            return _VOID
         return self.visit(ctx.attritype())
 
     # returnstmt: RETURN (expr | ) SEMI;
     def visitReturnstmt(self, ctx: OPLangParser.ReturnstmtContext):
-        value = self.visit(ctx.expr()) if ctx.expr() else NilLiteral()
+        value = self.visit(ctx.expr()) if ctx.expr() else _NIL
         return ReturnStatement(value)
 
     # assignstmt: lhs ASSIGN expr SEMI;
@@ -360,56 +490,53 @@ class ASTGeneration(OPLangVisitor):
         rhs = self.visit(ctx.expr())
         return AssignmentStatement(lhs, rhs)
 
-    # lhs: ID
-    # | arrayaccess
-    # | (ID | THIS) DOT arrayaccess
-    # | ID DOT ID
-    # | (ID | THIS) DOT lhs
-    # | (ID | THIS) callmethods DOT lhs
-    # | LBRACE exprlist RBRACE DOT lhs;
+    # lhs: ID                                      # lhsId
+    # | (ID | THIS) DOT arrayaccess                # lhsDotArrAcc
+    # | ID DOT ID                                  # lhsIdDotId
+    # | (ID | THIS) DOT lhs                        # lhsDotLhs
+    # | arrayaccess                                # lhsArrAcc
+    # | (ID | THIS) callmethods DOT lhs            # lhsCallDotLhs
+    # | LBRACE exprlist RBRACE DOT lhs;            # lhsArrLitDotLhs
 
     # IdLHS + PostfixLHS
     def visitLhs(self, ctx: OPLangParser.LhsContext):
+        alt = type(ctx)
 
         # ID
-        if ctx.ID() and ctx.getChildCount() == 1:
-            return IdLHS(ctx.ID(0).getText())
+        if alt is OPLangParser.LhsIdContext:
+            return IdLHS(ctx.ID().getText())
 
         # arrayaccess
-        if ctx.arrayaccess() and ctx.getChildCount() == 1:
+        if alt is OPLangParser.LhsArrAccContext:
             pe = self.visit(ctx.arrayaccess())
             return PostfixLHS(pe)
 
         # (ID | THIS) DOT arrayaccess
-        if ctx.DOT() and ctx.arrayaccess():
-            primary = Identifier(ctx.ID(0).getText()) if ctx.ID() else ThisExpression()
+        if alt is OPLangParser.LhsDotArrAccContext:
+            id_node = ctx.ID()
+            primary = _ident(id_node.getText()) if id_node else ThisExpression()
             nested = self.visit(ctx.arrayaccess())
-            return PostfixLHS(PostfixExpression(primary, [MemberAccess(nested.primary.name)] + nested.postfix_ops))
-
-        # THIS DOT ID
-        if ctx.THIS() and ctx.ID() and ctx.getChildCount() == 3:
-            primary = ThisExpression()
-            postfix_ops = [MemberAccess(ctx.ID(0).getText())]
-            return PostfixLHS(PostfixExpression(primary, postfix_ops))
+            return PostfixLHS(PostfixExpression(primary, [_mem(nested.primary.name)] + nested.postfix_ops))
 
         # ID DOT ID
-        if ctx.DOT() and ctx.ID() and ctx.getChildCount() == 3 and not ctx.lhs():
-            primary = Identifier(ctx.ID(0).getText())
-            postfix_ops = [MemberAccess(ctx.ID(1).getText())]
+        if alt is OPLangParser.LhsIdDotIdContext:
+            primary = _ident(ctx.ID(0).getText())
+            postfix_ops = [_mem(ctx.ID(1).getText())]
             return PostfixLHS(PostfixExpression(primary, postfix_ops))
 
         # (ID | THIS) DOT lhs
-        if ctx.DOT() and ctx.lhs():
-            primary = Identifier(ctx.ID(0).getText()) if ctx.ID() else ThisExpression()
+        if alt is OPLangParser.LhsDotLhsContext:
+            id_node = ctx.ID()
+            primary = _ident(id_node.getText()) if id_node else ThisExpression()
             nested = self.visit(ctx.lhs())
 
             if isinstance(nested, IdLHS):
-                return PostfixLHS(PostfixExpression(primary, [MemberAccess(nested.name)]))
+                return PostfixLHS(PostfixExpression(primary, [_mem(nested.name)]))
 
             if isinstance(nested, PostfixLHS):
                 inner = nested.postfix_expr
                 # Nối primary hiện tại (a) với toàn bộ chain của inner (b.c[...])
-                return PostfixLHS(PostfixExpression(primary, [MemberAccess(inner.primary.name)] + inner.postfix_ops))
+                return PostfixLHS(PostfixExpression(primary, [_mem(inner.primary.name)] + inner.postfix_ops))
 
             if isinstance(nested, PostfixExpression):
                 return PostfixLHS(PostfixExpression(primary, nested.postfix_ops))
@@ -421,7 +548,7 @@ class ASTGeneration(OPLangVisitor):
 
         # Case 6: (ID | THIS) callmethods DOT lhs
         # if ctx.callmethods() and ctx.lhs():
-        #     primary = Identifier(ctx.ID(0).getText()) if ctx.ID() else ThisExpression()
+        #     primary = _ident(ctx.ID(0).getText()) if ctx.ID() else ThisExpression()
         #     postfix_ops = self.visit(ctx.callmethods())
         #     nested = self.visit(ctx.lhs())
         #     return PostfixLHS(PostfixExpression(primary, postfix_ops + [nested]))
@@ -442,15 +569,16 @@ class ASTGeneration(OPLangVisitor):
     def visitIfstmt(self, ctx: OPLangParser.IfstmtContext):
         if ctx.IF():
             condition = self.visit(ctx.expr())
-            if ctx.stmtlist():
-                then_nodes = self.visit(ctx.stmtlist())
-                then_var_decls = [n for n in then_nodes if isinstance(n, VariableDecl)]
-                then_statements = [n for n in then_nodes if not isinstance(n, VariableDecl)]
+            stmtlist = ctx.stmtlist()
+            elselist = ctx.elselist()
+            if stmtlist:
+                then_nodes = self.visit(stmtlist)
+                then_var_decls, then_statements = self._partition(then_nodes)
                 then_stmt = BlockStatement(then_var_decls, then_statements)
             else:
                 then_stmt = self.visit(ctx.stmt())
 
-            else_stmt = self.visit(ctx.elselist()) if ctx.elselist() else None
+            else_stmt = self.visit(elselist) if elselist else None
             return IfStatement(condition, then_stmt, else_stmt)
 
     # elselist: ELSE (LBRACE stmtlist RBRACE | stmt) elselist |;
@@ -458,18 +586,19 @@ class ASTGeneration(OPLangVisitor):
         if ctx.getChildCount() == 0:
             return None
         else:
-            if ctx.stmtlist():
+            stmtlist = ctx.stmtlist()
+            elselist = ctx.elselist()
+            if stmtlist:
                 # else { stmtlist }
-                else_nodes = self.visit(ctx.stmtlist()) or []
-                var_decls = [n for n in else_nodes if isinstance(n, VariableDecl)]
-                statements = [n for n in else_nodes if not isinstance(n, VariableDecl)]
+                else_nodes = self._visit_or_empty(stmtlist)
+                var_decls, statements = self._partition(else_nodes)
                 current_else = BlockStatement(var_decls, statements)
             elif ctx.stmt():
                 # else stmt
                 current_else = self.visit(ctx.stmt())
 
                 # check nested else
-            nested_else = self.visit(ctx.elselist()) if ctx.elselist() else None
+            nested_else = self.visit(elselist) if elselist else None
 
             if nested_else:
                 return IfStatement(None, current_else, nested_else)
@@ -488,10 +617,10 @@ class ASTGeneration(OPLangVisitor):
 
         end_expr = self.visit(ctx.expr(1))
 
-        if ctx.stmtlist():
-            body_nodes = self.visit(ctx.stmtlist())
-            var_decls = [n for n in body_nodes if isinstance(n, VariableDecl)]
-            statements = [n for n in body_nodes if not isinstance(n, VariableDecl)]
+        stmtlist = ctx.stmtlist()
+        if stmtlist:
+            body_nodes = self.visit(stmtlist)
+            var_decls, statements = self._partition(body_nodes)
             body = BlockStatement(var_decls, statements)
 
         elif ctx.stmt():
@@ -501,47 +630,33 @@ class ASTGeneration(OPLangVisitor):
 
     # continuestmt: CONTINUE SEMI;
     def visitContinuestmt(self, ctx: OPLangParser.ContinuestmtContext):
-        return ContinueStatement()
+        return _CONTINUE
 
     # breakstmt: BREAK SEMI;
     def visitBreakstmt(self, ctx: OPLangParser.BreakstmtContext):
-        return BreakStatement()
+        return _BREAK
 
     # type: premitivetype | arrtype | classtype;
     def visitType(self, ctx: OPLangParser.TypeContext):
-        if ctx.premitivetype():
-            return self.visit(ctx.premitivetype())
-        elif ctx.arrtype():
-            return self.visit(ctx.arrtype())
-        elif ctx.classtype():
-            return self.visit(ctx.classtype())
+        return self._dispatch_first(ctx, self._TYPE_DISPATCH)
 
     # premitivetype: INT | FLOAT | BOOLEAN | STRING | VOID;
     def visitPremitivetype(self, ctx: OPLangParser.PremitivetypeContext):
-        if ctx.INT():
-            return PrimitiveType("int")
-        elif ctx.FLOAT():
-            return PrimitiveType("float")
-        elif ctx.BOOLEAN():
-            return PrimitiveType("boolean")
-        elif ctx.STRING():
-            return PrimitiveType("string")
-        elif ctx.VOID():
-            return PrimitiveType("void")
+        return _PRIMITIVE_BY_TOKEN[ctx.getChild(0).symbol.type]
 
     # arrtype: (INT | FLOAT | BOOLEAN | STRIN | classtype) LBRACK INTEGER_LITERAL RBRACK (AMP | );
     def visitArrtype(self, ctx: OPLangParser.ArrtypeContext):
-        size = int(ctx.INTEGER_LITERAL().getText())
+        size = _int_of(ctx.INTEGER_LITERAL().getText())
         if ctx.INT():
-            element_type = PrimitiveType("int")
+            element_type = _INT
         elif ctx.FLOAT():
-            element_type = PrimitiveType("float")
+            element_type = _FLOAT
         elif ctx.BOOLEAN():
-            element_type = PrimitiveType("boolean")
+            element_type = _BOOL
         elif ctx.STRING():
-            element_type = PrimitiveType("string")
+            element_type = _STR
         elif ctx.classtype():
-            element_type = ClassType(ctx.classtype().getText())
+            element_type = _classtype(ctx.classtype().getText())
 
         arr_type = ArrayType(element_type, size)
 
@@ -554,12 +669,12 @@ class ASTGeneration(OPLangVisitor):
     # classtype: ID;
     def visitClasstype(self, ctx: OPLangParser.ClasstypeContext):
         class_name = ctx.ID().getText()
-        return ClassType(class_name)
+        return _classtype(class_name)
 
     # objectarrtype: classtype LBRACK INTEGER_LITERAL RBRACK (AMP | );
     def visitObjectarrtype(self, ctx: OPLangParser.ObjectarrtypeContext):
         element_type = self.visit(ctx.classtype())
-        size = int(ctx.INTEGER_LITERAL().getText())
+        size = _int_of(ctx.INTEGER_LITERAL().getText())
         arr_type = ArrayType(element_type, size)
 
         if ctx.AMP():
@@ -583,15 +698,15 @@ class ASTGeneration(OPLangVisitor):
 
     # expr: relationexpr;
     def visitExpr(self, ctx: OPLangParser.ExprContext):
-        return self.visit(ctx.relationexpr())
+        return self._visit_operand(ctx.relationexpr())
 
     # relationexpr: equalityexpr (LESS | GREATER | LESSEQ | GREATEREQ) equalityexpr
     #               | equalityexpr;
     def visitRelationexpr(self, ctx: OPLangParser.RelationexprContext):
         if ctx.getChildCount() == 1:
-            return self.visit(ctx.equalityexpr(0))
+            return self._visit_operand(ctx.equalityexpr(0))
         else:
-            lhs = self.visit(ctx.equalityexpr(0))
+            lhs = self._visit_operand(ctx.equalityexpr(0))
             if ctx.LESS():
                 operator = "<"
             elif ctx.GREATER():
@@ -601,7 +716,7 @@ class ASTGeneration(OPLangVisitor):
             elif ctx.GREATEREQ():
                 operator = ">="
 
-            rhs = self.visit(ctx.equalityexpr(1))
+            rhs = self._visit_operand(ctx.equalityexpr(1))
             return BinaryOp(lhs, operator, rhs)
 
     # equalityexpr: equalchain | nequalexpr| andorexpr;
@@ -615,92 +730,53 @@ class ASTGeneration(OPLangVisitor):
 
     # equalchain: andorexpr EQUAL andorexpr;
     def visitEqualchain(self, ctx: OPLangParser.EqualchainContext):
-        lhs = self.visit(ctx.andorexpr(0))
+        lhs = self._visit_operand(ctx.andorexpr(0))
         operator_equal = "=="
-        rhs = self.visit(ctx.andorexpr(1))
+        rhs = self._visit_operand(ctx.andorexpr(1))
         return BinaryOp(lhs, operator_equal, rhs)
 
     # nequalexpr: andorexpr NEQUAL andorexpr;
     def visitNequalexpr(self, ctx: OPLangParser.NequalexprContext):
-        lhs = self.visit(ctx.andorexpr(0))
+        lhs = self._visit_operand(ctx.andorexpr(0))
         operator_nequal = "!="
-        rhs = self.visit(ctx.andorexpr(1))
+        rhs = self._visit_operand(ctx.andorexpr(1))
         return BinaryOp(lhs, operator_nequal, rhs)
 
     # andorexpr: andorexpr (AND | OR) addsubexpr | addsubexpr;
     def visitAndorexpr(self, ctx: OPLangParser.AndorexprContext):
-        if ctx.andorexpr():
-            lhs = self.visit(ctx.andorexpr())
-
-            if ctx.AND():
-                operator = "&&"
-            elif ctx.OR():
-                operator = "||"
-
-            rhs = self.visit(ctx.addsubexpr())
-
-            return BinaryOp(lhs, operator, rhs)
-        return self.visit(ctx.addsubexpr())
+        return self._fold_left(ctx)
 
     # addsubexpr: addsubexpr (ADDOP | SUBOP) muldivexpr | muldivexpr;
     def visitAddsubexpr(self, ctx: OPLangParser.AddsubexprContext):
-        if ctx.addsubexpr():
-            lhs = self.visit(ctx.addsubexpr())
-
-            if ctx.ADDOP():
-                operator = "+"
-            elif ctx.SUBOP():
-                operator = "-"
-            rhs = self.visit(ctx.muldivexpr())
-
-            return BinaryOp(lhs, operator, rhs)
-
-        return self.visit(ctx.muldivexpr())
+        return self._fold_left(ctx)
 
     # muldivexpr: muldivexpr (MULOP | DIVOP | BACKSLASH | MODOP) concatexpr | concatexpr;
     def visitMuldivexpr(self, ctx: OPLangParser.MuldivexprContext):
-        if ctx.muldivexpr():
-            lhs = self.visit(ctx.muldivexpr())
-            if ctx.MULOP():
-                operator = "*"
-            elif ctx.DIVOP():
-                operator = "/"
-            elif ctx.BACKSLASH():
-                operator = ctx.BACKSLASH().getText()
-            elif ctx.MODOP():
-                operator = "%"
-            rhs = self.visit(ctx.concatexpr())
-
-            return BinaryOp(lhs, operator, rhs)
-
-        return self.visit(ctx.concatexpr())
+        return self._fold_left(ctx)
 
     # concatexpr: concatexpr EXP unaryexpr | unaryexpr;
     def visitConcatexpr(self, ctx: OPLangParser.ConcatexprContext):
-        if ctx.concatexpr():
-            lhs = self.visit(ctx.concatexpr())
-            operator = "^"
-            rhs = self.visit(ctx.unaryexpr())
-            return BinaryOp(lhs, operator, rhs)
-        return self.visit(ctx.unaryexpr())
+        return self._fold_left(ctx)
 
     # unaryexpr: addsub postfix | NOT unaryexpr | postfix;
     def visitUnaryexpr(self, ctx: OPLangParser.UnaryexprContext):
-        if ctx.addsub():
-            operators = self.visit(ctx.addsub())
-            operand = self.visit(ctx.postfix())
-            # build từ trong ra ngoài
-            for operator in reversed(operators):
-                operand = UnaryOp(operator, operand)
-            return operand
-
-        elif ctx.NOT():
-            operator = "!"
-            operand = self.visit(ctx.unaryexpr())
-            return UnaryOp(operator, operand)
-
-        else:
-            return self.visit(ctx.postfix())
+        # Collect the prefix operators (!, +, -) walking down the chain, then wrap the
+        # operand from the innermost operator outwards
+        operators = []
+        while ctx.NOT():
+            operators.append("!")
+            ctx = ctx.unaryexpr()
+        addsub = ctx.addsub()
+        while addsub is not None:
+            operators.append(addsub.getChild(0).getText())
+            addsub = addsub.addsub()
+        operand = self.visit(ctx.postfix())
+
+        i = len(operators) - 1
+        while i >= 0:
+            operand = UnaryOp(operators[i], operand)
+            i -= 1
+        return operand
 
     # postfix: primary postfixoplist | arrayaccess;
     def visitPostfix(self, ctx: OPLangParser.PostfixContext):
@@ -716,75 +792,65 @@ class ASTGeneration(OPLangVisitor):
     # for muiltiple unary + and
     # E.g: +++-- => ['+', '+', '+', '-', '-']
     def visitAddsub(self, ctx: OPLangParser.AddsubContext):
-        if ctx.addsub():
-            operator = ctx.ADDOP().getText() if ctx.ADDOP() else ctx.SUBOP().getText()
-            return [operator] + self.visit(ctx.addsub())
-        else:
-            return [ctx.ADDOP().getText()] if ctx.ADDOP() else [ctx.SUBOP().getText()]
+        operators = []
+        while ctx is not None:
+            operators.append(ctx.getChild(0).getText())
+            ctx = ctx.addsub()
+        return operators
 
     # postfixoplist: postfixop postfixoplist | ;
     def visitPostfixoplist(self, ctx: OPLangParser.PostfixoplistContext):
-        if ctx.getChildCount() == 0:
-            return []
-
-        postfixop = self.visit(ctx.postfixop())
-        postfixoplist = self.visit(ctx.postfixoplist()) or []
-
-        # Flatten: nếu first là list, nối vào luôn
-        if isinstance(postfixop, list):
-            return postfixop + postfixoplist
-        else:
-            return [postfixop] + postfixoplist
+        ops = []
+        while ctx.getChildCount() != 0:
+            ops.extend(self.visitPostfixop(ctx.postfixop()))
+            ctx = ctx.postfixoplist()
+        return ops
 
     # postfixop:  callmethods | DOT ID | DOT arrayaccess;
+    # Always a list, so visitPostfixoplist can extend without checking
     def visitPostfixop(self, ctx: OPLangParser.PostfixopContext):
-        if ctx.callmethods():
-            calls = self.visit(ctx.callmethods()) or []
-            return calls
-        elif ctx.ID():
-            return MemberAccess(ctx.ID().getText())
-        elif ctx.arrayaccess():
-            return [self.visit(ctx.arrayaccess())]
+        first = ctx.getChild(0)
+        if isinstance(first, OPLangParser.CallmethodsContext):
+            return self._visit_or_empty(first)
+        second = ctx.getChild(1)
+        if isinstance(second, OPLangParser.ArrayaccessContext):
+            return [self.visitArrayaccess(second)]
+        elif second is not None:
+            return [_mem(second.getText())]
         else:
             return []
 
     # arrayaccess: ID arr;
     def visitArrayaccess(self, ctx: OPLangParser.ArrayaccessContext):
         base_name = ctx.ID().getText()
-        primary = Identifier(base_name)
-        postfix_ops = self.visit(ctx.arr()) or []
+        primary = _ident(base_name)
+        postfix_ops = self._visit_or_empty(ctx.arr())
         return PostfixExpression(primary, postfix_ops)
 
     # arr: LBRACK expr RBRACK arr | LBRACK expr RBRACK;.
     def visitArr(self, ctx: OPLangParser.ArrContext):
-        expr = self.visit(ctx.expr())
-        accesses = [ArrayAccess(expr)]
-        if ctx.arr():
-            accesses += self.visit(ctx.arr())
+        accesses = []
+        while ctx is not None:
+            accesses.append(ArrayAccess(self.visit(ctx.expr())))
+            ctx = ctx.arr()
         return accesses
 
     # callmethods: DOT ID LB optionalarglist RB (callmethods | ) (arr |)
     def visitCallmethods(self, ctx: OPLangParser.CallmethodsContext):
-
-        method_name = ctx.ID().getText()
-        args = self.visit(ctx.optionalarglist()) or []
-        postfix_ops = [MethodCall(method_name, args)]
-
+        postfix_ops = []
+        trailing_arrs = []
         # Nếu có call chain .foo().bar()
-        if ctx.callmethods():
-            next_ops = self.visit(ctx.callmethods()) or []
-            if isinstance(next_ops, list):
-                postfix_ops += next_ops
-            else:
-                postfix_ops.append(next_ops)
-
-        #  Nếu có array sau method .foo()[0]
-        if ctx.arr():
-            arr_ops = self.visit(ctx.arr()) or []
-            if isinstance(arr_ops, list):
-                postfix_ops.extend(arr_ops)
-            else:
-                postfix_ops.append(arr_ops)
+        while ctx is not None:
+            method_name = ctx.ID().getText()
+            args = self._visit_or_empty(ctx.optionalarglist())
+            postfix_ops.append(MethodCall(method_name, args))
+            trailing_arrs.append(ctx.arr())
+            ctx = ctx.callmethods()
+
+        #  Nếu có array sau method .foo()[0]: the innermost call's index comes first
+        for arr in reversed(trailing_arrs):
+            if arr is not None:
+                postfix_ops.extend(self.visitArr(arr))
 
         return postfix_ops
 
@@ -797,91 +863,90 @@ class ASTGeneration(OPLangVisitor):
 
     # arglist: expr arglisttail;
     def visitArglist(self, ctx: OPLangParser.ArglistContext):
-        return [self.visit(ctx.expr())] + (self.visit(ctx.arglisttail()) or [])
+        args = [self.visit(ctx.expr())]
+        args.extend(self.visitArglisttail(ctx.arglisttail()))
+        return args
 
     # arglisttail: COMMA expr arglisttail |;
     def visitArglisttail(self, ctx: OPLangParser.ArglisttailContext):
-        if ctx.getChildCount() == 0:
-            return []
-        return [self.visit(ctx.expr())] + (self.visit(ctx.arglisttail()) or [])
+        args = []
+        while ctx.getChildCount() != 0:
+            args.append(self.visit(ctx.expr()))
+            ctx = ctx.arglisttail()
+        return args
 
     # Visit a parse tree produced by OPLangParser#primary.
     def visitPrimary(self, ctx: OPLangParser.PrimaryContext):
-        # Literal cases
-        if ctx.INTEGER_LITERAL():
-            return IntLiteral(int(ctx.INTEGER_LITERAL().getText()))
-        if ctx.FLOAT_LITERAL():
-            return FloatLiteral(float(ctx.FLOAT_LITERAL().getText()))
-        if ctx.STRING_LITERAL():
-            return StringLiteral(ctx.STRING_LITERAL().getText())
-        if ctx.BOOLEAN_LITERAL():
-            val = ctx.BOOLEAN_LITERAL().getText()
-            return BoolLiteral(val == "true")
-
-        # ID
-        if ctx.ID() and ctx.getChildCount() == 1:
-            return Identifier(ctx.ID().getText())
-
-        # THIS
-        if ctx.THIS() and ctx.getChildCount() == 1:
-            return ThisExpression()
+        # Literal, ID, THIS and NIL cases: one token, switch on its type
+        if ctx.getChildCount() == 1:
+            first = ctx.getChild(0)
+            if isinstance(first, TerminalNode):
+                build = _PRIMARY_BY_TOKEN.get(first.symbol.type)
+                if build is not None:
+                    return build(first.getText())
 
-        # NIL
-        if ctx.NIL():
-            return NilLiteral()
+        tokens, rules = self._index_children(ctx)
+        id_node = tokens.get(OPLangParser.ID)
+        this_node = tokens.get(OPLangParser.THIS)
 
         # NEW ID LB optionalarglist RB
-        if ctx.NEW():
-            class_name = ctx.ID().getText()
-            args = self.visit(ctx.optionalarglist()) or []
+        if OPLangParser.NEW in tokens:
+            class_name = id_node.getText()
+            args = self._visit_or_empty(rules.get(OPLangParser.RULE_optionalarglist, (None,))[0])
             return ObjectCreation(class_name, args)
 
+        lb = tokens.get(OPLangParser.LB)
+        exprs = rules.get(OPLangParser.RULE_expr, ())
+        lbrace = tokens.get(OPLangParser.LBRACE)
+        rbrace = tokens.get(OPLangParser.RBRACE)
+        lbrack = tokens.get(OPLangParser.LBRACK)
+        exprlists = rules.get(OPLangParser.RULE_exprlist, ())
+
         # LB expr RB => grouping expression (thường lấy exprlist đầu tiên)
-        if ctx.LB() and ctx.RB() and ctx.expr():
-            expr = self.visit(ctx.expr(0))
+        if lb and OPLangParser.RB in tokens and exprs:
+            expr = self.visit(exprs[0])
             return ParenthesizedExpression(expr)
 
         # { exprlist }  => ArrayLiteral: {1, 2, 3,...}
-        if ctx.LBRACE() and ctx.RBRACE() and ctx.exprlist() and not ctx.LBRACK():
-            exprlist_ctx = ctx.exprlist(0)  # lấy phần tử đầu tiên thay vì ctx.exprlist()
-            elements = self.visit(ctx.exprlist(0))
+        if lbrace and rbrace and exprlists and not lbrack:
+            elements = self.visit(exprlists[0])
             return ArrayLiteral(elements)
 
         # { exprlist } [ exprlist ] => PostfixExpression(ArrayLiteral, [ArrayAccess...])
-        if ctx.LBRACE() and ctx.RBRACE() and ctx.LBRACK() and ctx.exprlist(1):
-            exprlist_ctx = ctx.exprlist(1)
-            elements = self.visit(ctx.exprlist(0)) or []
+        if lbrace and rbrace and lbrack and len(exprlists) > 1:
+            elements = self._visit_or_empty(exprlists[0])
             array_lit = ArrayLiteral(elements)
-            indices = self.visit(ctx.exprlist(1)) or []
             # Mỗi expr trong exprlist là 1 chỉ số
-            array_ops = [ArrayAccess(idx) for idx in indices]
+            array_ops = list(map(ArrayAccess, self._visit_or_empty(exprlists[1])))
             return PostfixExpression(array_lit, array_ops)
 
         # (ID | THIS) crazy
-        if ctx.crazy():
-            if ctx.ID():
-                primary = Identifier(ctx.ID(0).getText())
-            elif ctx.THIS():
+        crazy = rules.get(OPLangParser.RULE_crazy)
+        if crazy:
+            crazy = crazy[0]
+            if id_node:
+                primary = _ident(id_node.getText())
+            elif this_node:
                 primary = ThisExpression()
             else:
                 primary = None
-            crazy_ops = self.visit(ctx.crazy()) or []
+            crazy_ops = self._visit_or_empty(crazy)
             return PostfixExpression(primary, crazy_ops)
 
         # { }  => Empty ArrayLiteral
-        if ctx.LBRACE() and ctx.RBRACE() and not ctx.exprlist():
+        if lbrace and rbrace and not exprlists:
             return ArrayLiteral([])
 
         # (THIS | LB expr RB) LBRACK expr RBRACK
-        if ctx.LBRACK() and ctx.RBRACK() and ctx.expr():
-            if ctx.THIS():
+        if lbrack and OPLangParser.RBRACK in tokens and exprs:
+            if this_node:
                 primary = ThisExpression()
-            elif ctx.LB():
+            elif lb:
                 # (expr) lấy expr bên trong
-                primary = self.visit(ctx.expr(0))
+                primary = self.visit(exprs[0])
             else:
                 primary = None
-            index_expr = self.visit(ctx.expr(-1))  # expr cuối là chỉ số
+            index_expr = self.visit(exprs[-1])  # expr cuối là chỉ số
             return PostfixExpression(primary, [ArrayAccess(index_expr)])
 
         # fallback
@@ -890,31 +955,59 @@ class ASTGeneration(OPLangVisitor):
     # crazy: (DOT ID | arrtype) crazy | (DOT ID | arrtype);
     def visitCrazy(self, ctx: OPLangParser.CrazyContext):
         ops = []
-
-        # DOT ID
-        if ctx.DOT() and ctx.ID():
-            ops.append(MemberAccess(ctx.ID().getText()))
-
-        # arrtype
-        if ctx.arrtype():
-            arr_type = self.visit(ctx.arrtype())
-            # arrtype thường dùng cho static member access
-            ops.append(arr_type)
-
-        # đệ quy crazy phía sau
-        if ctx.crazy():
-            tail = self.visit(ctx.crazy())
-            if isinstance(tail, list):
-                ops.extend(tail)
-            else:
-                ops.append(tail)
+        while ctx is not None:
+            # DOT ID
+            id_node = ctx.ID()
+            if id_node and ctx.DOT():
+                ops.append(_mem(id_node.getText()))
+
+            # arrtype
+            arrtype = ctx.arrtype()
+            if arrtype:
+                # arrtype thường dùng cho static member access
+                ops.append(self.visit(arrtype))
+
+            ctx = ctx.crazy()
         return ops
 
     # exprlist: expr COMMA exprlist | expr;
     def visitExprlist(self, ctx: OPLangParser.ExprlistContext):
-        if ctx.exprlist():
-            return [self.visit(ctx.expr())] + self.visit(ctx.exprlist())
-        else:
-            return [self.visit(ctx.expr())]
-
-
+        exprs = []
+        while ctx is not None:
+            exprs.append(self.visit(ctx.expr()))
+            ctx = ctx.exprlist()
+        return exprs
+
+    # Jump tables: rule index of the first child -> handler
+    _MEMBER_DISPATCH = {
+        OPLangParser.RULE_attridecl: visitAttridecl,
+        OPLangParser.RULE_methoddecl: visitMethoddecl,
+        OPLangParser.RULE_constructor: visitConstructor,
+        OPLangParser.RULE_destructor: visitDestructor,
+    }
+
+    _CONSTRUCTOR_DISPATCH = {
+        OPLangParser.RULE_defaultconstructor: visitDefaultconstructor,
+        OPLangParser.RULE_copyconstructor: visitCopyconstructor,
+        OPLangParser.RULE_userdefinedconstructor: visitUserdefinedconstructor,
+    }
+
+    _STMT_DISPATCH = {
+        OPLangParser.RULE_vardef: visitVardef,
+        OPLangParser.RULE_returnstmt: visitReturnstmt,
+        OPLangParser.RULE_ifstmt: visitIfstmt,
+        OPLangParser.RULE_forstmt: visitForstmt,
+        # terminal-only rules map straight to their shared node
+        OPLangParser.RULE_continuestmt: lambda self, ctx: _CONTINUE,
+        OPLangParser.RULE_breakstmt: lambda self, ctx: _BREAK,
+        OPLangParser.RULE_reftype: visitReftype,
+        OPLangParser.RULE_assignstmt: visitAssignstmt,
+        OPLangParser.RULE_callexpr: visitCallexpr,
+        OPLangParser.RULE_body: visitBody,
+    }
+
+    _TYPE_DISPATCH = {
+        OPLangParser.RULE_premitivetype: lambda self, ctx: _PRIMITIVE_BY_TOKEN[ctx.getChild(0).symbol.type],
+        OPLangParser.RULE_arrtype: visitArrtype,
+        OPLangParser.RULE_classtype: lambda self, ctx: _classtype(ctx.ID().getText()),
+    }
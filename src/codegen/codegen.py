@@ -4,15 +4,76 @@ This module implements a code generator that traverses AST nodes and generates
 Java bytecode using the Emitter and Frame classes.
 """
 
+from collections import ChainMap
 from typing import Any, List, Optional
 from ..utils.visitor import ASTVisitor
 from ..utils.nodes import *
 from .emitter import Emitter, is_void_type, is_int_type, is_string_type, is_bool_type, is_float_type
+from .emitter import _T_INT, _T_FLOAT, _T_BOOL, _T_STRING, _T_VOID
 from .frame import Frame
 from .error import IllegalOperandException, IllegalRuntimeException
 from .io import IO_SYMBOL_LIST
+from .jasmin_code import JasminCode
 from .utils import *
-from functools import *
+
+
+# Shared type objects for the paths that always produce the same type; types are never mutated
+_T_INT2STR = FunctionType([_T_INT], _T_STRING)
+_INT2STR_NAME = "java/lang/String/valueOf"
+_T_PRINT = FunctionType([_T_STRING], _T_VOID)
+_T_MAIN = FunctionType([ArrayType(_T_STRING, 0)], _T_VOID)
+_T_DEFAULT_INIT = FunctionType([], _T_VOID)
+
+# Compile-time folding of literal int/boolean expressions (CodeGenerator._fold_constant);
+# int results wrap to 32 bits like the JVM's iadd/isub/imul/idiv/irem
+_INT_MIN, _INT_MAX = -(1 << 31), (1 << 31) - 1
+_INT_FOLD = {
+    "+": lambda l, r: l + r,
+    "-": lambda l, r: l - r,
+    "*": lambda l, r: l * r,
+}
+_REL_FOLD = {
+    ">": lambda l, r: l > r,
+    ">=": lambda l, r: l >= r,
+    "<": lambda l, r: l < r,
+    "<=": lambda l, r: l <= r,
+    "==": lambda l, r: l == r,
+    "!=": lambda l, r: l != r,
+}
+
+
+# Int literal pushes (visit_int_literal): the instruction is picked from the value right here
+_ICONST = {i: JasminCode.INDENT + ("iconst_m1" if i == -1 else f"iconst_{i}") + JasminCode.END for i in range(-1, 6)}
+_BIPUSH = (JasminCode.INDENT + "bipush {}" + JasminCode.END).format
+_SIPUSH = (JasminCode.INDENT + "sipush {}" + JasminCode.END).format
+_LDC = (JasminCode.INDENT + "ldc {}" + JasminCode.END).format
+
+
+def _push_int(v):
+    code = _ICONST.get(v)
+    if code is None:
+        if -128 <= v <= 127:
+            code = _BIPUSH(v)
+        elif -32768 <= v <= 32767:
+            code = _SIPUSH(v)
+        else:
+            code = _LDC(v)
+    return code
+
+
+def _wrap_int(value):
+    return (value - _INT_MIN) % (1 << 32) + _INT_MIN
+
+
+# IO symbols visible in every method body; print/int2str are listed first so they win over IO_SYMBOL_LIST
+_IO_SYMBOLS = {
+    sym.name: sym
+    for sym in reversed([
+        Symbol("print", _T_PRINT, CName("io")),
+        Symbol("int2str", _T_INT2STR, CName("io")),
+        *IO_SYMBOL_LIST,
+    ])
+}
 
 
 class CodeGenerator(ASTVisitor):
@@ -21,9 +82,15 @@ class CodeGenerator(ASTVisitor):
     Traverses AST and generates JVM bytecode.
     """
     
-    def __init__(self):
+    def __init__(self, output_dir: Optional[str] = None):
+        self.output_dir = output_dir  # where .j files go; None means src/runtime
         self.current_class = None
         self.emit = None  # Will be initialized per class
+        self._consts = {}  # id(expr) -> folded literal or None, see _fold_constant
+        self._call_names = {}  # (class, method) -> "class/method" for static calls
+        self.main_class = None  # first class given a JVM main method, read by the test runner
+        self._class_decls = {}  # class name -> ClassDecl, for instance method lookup
+        self._virtual = {}  # (class, method) -> (owner class, MethodDecl) or None
 
     # ============================================================================
     # Program and Class Declarations
@@ -33,6 +100,10 @@ class CodeGenerator(ASTVisitor):
         """
         Visit program node - generate code for all classes.
         """
+        self._consts = {}
+        self.main_class = None
+        self._class_decls = {decl.name: decl for decl in node.class_decls}
+        self._virtual = {}
         # Process all class declarations
         for class_decl in node.class_decls:
             self.visit(class_decl, o)
@@ -43,19 +114,20 @@ class CodeGenerator(ASTVisitor):
         """
         self.current_class = node.name
         class_file = node.name + ".j"
-        self.emit = Emitter(class_file)
+        self.emit = Emitter(class_file, self.output_dir)
         
         # Determine superclass
         superclass = node.superclass if node.superclass else "java/lang/Object"
         
         # Emit class prolog
         self.emit.print_out(self.emit.emit_prolog(node.name, superclass))
-        
+
         # Process class members (attributes, methods, constructors, destructors)
         for member in node.members:
             self.visit(member, o)
-        
-        # Emit class epilog
+
+        # Emit class epilog: the .j file is only written here, so a class whose
+        # generation raised leaves no file behind
         self.emit.emit_epilog()
 
     # ============================================================================
@@ -123,7 +195,7 @@ class CodeGenerator(ASTVisitor):
         Visit destructor declaration - generate destructor code.
         """
         # Implement destructor generation *
-        frame = Frame("finalize", PrimitiveType("void"))
+        frame = Frame("finalize", _T_VOID)
         self.generate_method(node, frame, False)
 
     def visit_parameter(self, node: "Parameter", o: Any = None):
@@ -145,31 +217,21 @@ class CodeGenerator(ASTVisitor):
         if method_name == "main" and is_static:
             # Ép descriptor thành ([Ljava/lang/String;)V bằng cách tạo FunctionType giả lập
             # OPLang ArrayType cần element_type và size
-            mtype = FunctionType([ArrayType(PrimitiveType("string"), 0)], PrimitiveType("void"))
+            mtype = _T_MAIN
+            if self.main_class is None:
+                self.main_class = class_name
         else:
             param_types = [p.param_type for p in node.params]
             mtype = FunctionType(param_types, return_type)
 
-        # Emit method directive (.method public static main([Ljava/lang/String;)V)
-        self.emit.print_out(
-            self.emit.emit_method(
-                method_name,
-                mtype,
-                is_static
-            )
-        )
+        # Emitter entry points used per directive below, bound once
+        emit = self.emit
+        print_out = emit.print_out
 
-        frame.enter_scope(True)
-        from_label = frame.get_start_label()
-        to_label = frame.get_end_label()
+        from_label, to_label = frame.enter_scope(True)
 
         # 2. Quản lý Index: Giữ chỗ cho tham số trong bảng biến cục bộ
-        sym_list = []
-
-        extra_io = [
-            Symbol("print", FunctionType([PrimitiveType("string")], PrimitiveType("void")), CName("io")),
-            Symbol("int2str", FunctionType([PrimitiveType("int")], PrimitiveType("string")), CName("io"))
-        ]
+        sym_map = {}
 
         if method_name == "main" and is_static:
             # Index 0 dành cho tham số String[] args mà JVM truyền vào
@@ -177,49 +239,55 @@ class CodeGenerator(ASTVisitor):
         elif not is_static:
             # Index 0 dành cho 'this' đối với instance method
             this_idx = frame.get_new_index()
-            self.emit.print_out(
-                self.emit.emit_var(
-                    this_idx,
-                    "this",
-                    ClassType(class_name),
-                    from_label,
-                    to_label
-                )
-            )
-            sym_list.append(Symbol("this", ClassType(class_name), Index(this_idx)))
+            frame.pending_vars.append((this_idx, "this", ClassType(class_name), from_label, to_label))
+            sym_map["this"] = self._local_symbol("this", ClassType(class_name), this_idx)
 
         # Khai báo các tham số thực tế từ AST (nếu có)
         for param in node.params:
             idx = frame.get_new_index()
-            self.emit.print_out(
-                self.emit.emit_var(
-                    idx,
-                    param.name,
-                    param.param_type,
-                    from_label,
-                    to_label
-                )
-            )
-            sym_list.append(Symbol(param.name, param.param_type, Index(idx)))
+            frame.pending_vars.append((idx, param.name, param.param_type, from_label, to_label))
+            if param.name not in sym_map:
+                sym_map[param.name] = self._local_symbol(param.name, param.param_type, idx)
 
-        # Thêm các ký hiệu IO để có thể gọi hàm print, int2str...
-        sym_list = extra_io + IO_SYMBOL_LIST + sym_list
+        # Thêm các ký hiệu IO để có thể gọi hàm print, int2str... (IO names shadow this/params).
+        # The innermost map is a fresh dict, so a declaration can never land in the
+        # shared _IO_SYMBOLS
+        scope = ChainMap({}, _IO_SYMBOLS, sym_map)
 
-        self.emit.print_out(self.emit.emit_label(from_label, frame))
+        # Emit method directive (.method public static main([Ljava/lang/String;)V) and the start label
+        print_out(emit.emit_method(method_name, mtype, is_static) + emit.emit_label(from_label, frame))
 
         # 3. Generate code cho thân hàm (Body)
-        o = SubBody(frame, sym_list)
+        o = SubBody(frame, scope, from_label, to_label)
         self.visit(node.body, o)
 
         # Tự động thêm lệnh return nếu là hàm void
         if is_void_type(return_type):
-            self.emit.print_out(self.emit.emit_return(return_type, frame))
-
-        self.emit.print_out(self.emit.emit_label(to_label, frame))
-        self.emit.print_out(self.emit.emit_end_method(frame))
+            print_out(emit.emit_return(return_type, frame))
 
         frame.exit_scope()
 
+        # End label, .var directives for this/params/locals collected while walking the body, .limit/.end
+        emit.finish_method(to_label, frame.finalize())
+
+    def _local_symbol(self, name, typ, idx):
+        """Symbol for a local slot, with its load/store instructions built once."""
+        read_code, write_code = self.emit.get_local_codes(typ, idx)
+        return Symbol(name, typ, Index(idx), read_code, write_code)
+
+    def _read_local(self, sym, frame):
+        if sym.read_code is None:
+            # Not prebuilt: emit_read_var reports the unsupported type
+            return self.emit.emit_read_var(sym.name, sym.type, sym.value.value, frame)
+        frame.push()
+        return sym.read_code
+
+    def _write_local(self, sym, frame):
+        if sym.write_code is None:
+            return self.emit.emit_write_var(sym.name, sym.type, sym.value.value, frame)
+        frame.pop()
+        return sym.write_code
+
     # ============================================================================
     # Type System
     # ============================================================================
@@ -247,7 +315,10 @@ class CodeGenerator(ASTVisitor):
         if o is None:
             return
         
-        # Process variable declarations
+        # Process variable declarations: the block's locals go into one new innermost
+        # map, dropped with `o` when the block ends
+        if node.var_decls:
+            o = SubBody(o.frame, o.sym.new_child(), o.from_label, o.to_label)
         for var_decl in node.var_decls:
             o = self.visit(var_decl, o)
         
@@ -263,35 +334,33 @@ class CodeGenerator(ASTVisitor):
             return o
         
         frame = o.frame
-        from_label = frame.get_start_label()
-        to_label = frame.get_end_label()
+        from_label = o.from_label
+        to_label = o.to_label
         
-        new_sym = []
+        print_out = self.emit.print_out
+        add_var = frame.pending_vars.append
+
+        new_sym = {}
         for var in node.variables:
             idx = frame.get_new_index()
-            self.emit.print_out(
-                self.emit.emit_var(
-                    idx,
-                    var.name,
-                    node.var_type,
-                    from_label,
-                    to_label
-                )
-            )
+            # .var directive is written at the end of the method
+            add_var((idx, var.name, node.var_type, from_label, to_label))
             
             # Add to symbol list
-            new_sym.append(Symbol(var.name, node.var_type, Index(idx)))
+            sym = self._local_symbol(var.name, node.var_type, idx)
+            new_sym.setdefault(var.name, sym)
             
             # Handle initialization if present
             if var.init_value is not None:
                 # Generate code for initialization
-                code, typ = self.visit(var.init_value, Access(frame, o.sym))
-                self.emit.print_out(code)
-                self.emit.print_out(
-                    self.emit.emit_write_var(var.name, node.var_type, idx, frame)
-                )
+                code, typ = self.visit(var.init_value, o.read_access())
+                print_out(code)
+                print_out(self._write_local(sym, frame))
         
-        return SubBody(frame, new_sym + o.sym)
+        # Declared into the enclosing block's own map (see visit_block_statement), only
+        # after the initializers above have been generated against the outer names
+        o.sym.maps[0].update(new_sym)
+        return o
 
     def visit_variable(self, node: "Variable", o: Any = None):
         pass
@@ -303,12 +372,16 @@ class CodeGenerator(ASTVisitor):
         if o is None:
             return
         
+        # One Access for both sides: read for the RHS, then flipped to write for the LHS
+        access = o.read_access()
+
         # Generate code for RHS
-        code, typ = self.visit(node.rhs, Access(o.frame, o.sym))
+        code, typ = self.visit(node.rhs, access)
         self.emit.print_out(code)
         
         # Generate code for LHS
-        lhs_code, lhs_type = self.visit(node.lhs, Access(o.frame, o.sym, is_left=True))
+        access.is_left = True
+        lhs_code, lhs_type = self.visit(node.lhs, access)
         self.emit.print_out(lhs_code)
 
     def visit_if_statement(self, node: "IfStatement", o: Any = None):
@@ -317,7 +390,7 @@ class CodeGenerator(ASTVisitor):
         Implement if statement code generation
         """
         frame = o.frame
-        cond_code, _ = self.visit(node.condition, Access(frame, o.sym))
+        cond_code, _ = self.visit(node.condition, o.read_access())
         self.emit.print_out(cond_code)
         
         else_label = frame.get_new_label()
@@ -338,49 +411,58 @@ class CodeGenerator(ASTVisitor):
         Implement for statement code generation
         """
         frame = o.frame
+        emit = self.emit
+        print_out = emit.print_out
         # 1. Initialize
-        start_code, _ = self.visit(node.start_expr, Access(frame, o.sym))
-        self.emit.print_out(start_code)
-        sym = next(s for s in o.sym if s.name == node.variable)
-        self.emit.print_out(self.emit.emit_write_var(sym.name, sym.type, sym.value.value, frame))
+        start_code, _ = self.visit(node.start_expr, o.read_access())
+        print_out(start_code)
+        sym = o.sym[node.variable]
+        var_idx = sym.value.value
+        print_out(self._write_local(sym, frame))
+
+        # The bound is evaluated once, before the first test. Only a literal (after
+        # folding) is pushed again on every test; anything else, a plain variable
+        # included, is kept in a scratch local so the body cannot change it.
+        end_expr = node.end_expr
+        end_const = self._fold_constant(end_expr)
+        if end_const is not None:
+            end_expr = end_const
+        if end_expr.__class__ is IntLiteral:
+            end_idx = None
+        else:
+            end_code, _ = self.visit(end_expr, o.read_access())
+            end_idx = frame.get_new_index()
+            print_out(end_code)
+            print_out(emit.emit_write_var("", _T_INT, end_idx, frame))
         
         loop_label = frame.get_new_label()
-        continue_label = frame.get_new_label()
-        break_label = frame.get_new_label()
-        
-        frame.enter_loop()
-        frame.con_label.append(continue_label)
-        frame.brk_label.append(break_label)
+        continue_label, break_label = frame.enter_loop()
         
-        self.emit.print_out(self.emit.emit_label(loop_label, frame))
+        print_out(emit.emit_label(loop_label, frame))
         
         # 2. Condition
-        self.emit.print_out(self.emit.emit_read_var(sym.name, sym.type, sym.value.value, frame))
-        end_code, _ = self.visit(node.end_expr, Access(frame, o.sym))
-        self.emit.print_out(end_code)
+        print_out(self._read_local(sym, frame))
+        if end_idx is None:
+            end_code, _ = self.visit(end_expr, o.read_access())
+        else:
+            end_code = emit.emit_read_var("", _T_INT, end_idx, frame)
+        print_out(end_code)
         
         if node.direction == "to":
-            self.emit.print_out(self.emit.jvm.emitIFICMPGT(break_label))
+            print_out(emit.jvm.emitIFICMPGT(break_label))
         else:
-            self.emit.print_out(self.emit.jvm.emitIFICMPLT(break_label))
-        frame.pop(); frame.pop()
+            print_out(emit.jvm.emitIFICMPLT(break_label))
+        frame.adjust_stack(-2)
         
         # 3. Body
         self.visit(node.body, o)
         
-        # 4. Update
-        self.emit.print_out(self.emit.emit_label(continue_label, frame))
-        self.emit.print_out(self.emit.emit_read_var(sym.name, sym.type, sym.value.value, frame))
-        self.emit.print_out(self.emit.emit_push_iconst(1, frame))
-        if node.direction == "to":
-            self.emit.print_out(self.emit.jvm.emitIADD())
-        else:
-            self.emit.print_out(self.emit.jvm.emitISUB())
-        frame.pop()
-        self.emit.print_out(self.emit.emit_write_var(sym.name, sym.type, sym.value.value, frame))
+        # 4. Update: the loop variable is an int local, so step it in place
+        print_out(emit.emit_label(continue_label, frame))
+        print_out(emit.jvm.emitIINC(var_idx, 1 if node.direction == "to" else -1))
         
-        self.emit.print_out(self.emit.emit_goto(loop_label, frame))
-        self.emit.print_out(self.emit.emit_label(break_label, frame))
+        print_out(emit.emit_goto(loop_label, frame))
+        print_out(emit.emit_label(break_label, frame))
         
         frame.exit_loop()
 
@@ -389,14 +471,16 @@ class CodeGenerator(ASTVisitor):
         Visit break statement.
         Implement break statement code generation
         """
-        self.emit.print_out(self.emit.emit_goto(o.frame.get_break_label(), o.frame))
+        frame = o.frame
+        self.emit.print_out(self.emit.emit_goto(frame.get_break_label(), frame))
 
     def visit_continue_statement(self, node: "ContinueStatement", o: Any = None):
         """
         Visit continue statement.
         Implement continue statement code generation
         """
-        self.emit.print_out(self.emit.emit_goto(o.frame.get_continue_label(), o.frame))
+        frame = o.frame
+        self.emit.print_out(self.emit.emit_goto(frame.get_continue_label(), frame))
 
     def visit_return_statement(self, node: "ReturnStatement", o: SubBody = None):
         """
@@ -406,7 +490,7 @@ class CodeGenerator(ASTVisitor):
             return
         
         # Generate code for return value
-        code, typ = self.visit(node.value, Access(o.frame, o.sym))
+        code, typ = self.visit(node.value, o.read_access())
         self.emit.print_out(code)
         
         # Emit return instruction
@@ -420,7 +504,7 @@ class CodeGenerator(ASTVisitor):
         """
         # Implement method invocation statement
 
-        code, typ = self.visit(node.method_call, Access(o.frame, o.sym, False))
+        code, typ = self.visit(node.method_call, o.read_access())
         self.emit.print_out(code)
 
         if not is_void_type(typ):
@@ -437,15 +521,12 @@ class CodeGenerator(ASTVisitor):
             return "", None
         
         # Find symbol
-        sym = next(filter(lambda x: x.name == node.name, o.sym), None)
+        sym = o.sym.get(node.name)
         if sym is None:
             raise IllegalOperandException(f"Undeclared variable: {node.name}")
         
-        if type(sym.value) is Index:
-            code = self.emit.emit_write_var(
-                sym.name, sym.type, sym.value.value, o.frame
-            )
-            return code, sym.type
+        if sym.is_local:
+            return self._write_local(sym, o.frame), sym.type
         else:
             raise IllegalOperandException(f"Cannot assign to: {node.name}")
 
@@ -460,90 +541,224 @@ class CodeGenerator(ASTVisitor):
     # Expressions
     # ============================================================================
 
-    def visit_binary_op(self, node: "BinaryOp", o: Access = None):
-        """
-        Visit binary operation.
-        Implement binary operation code generation
-        """
-        lc, lt = self.visit(node.left, o)
-        rc, rt = self.visit(node.right, o)
-        
+    def _const_of(self, node):
+        """Literal value of an already-folded expression (see _fold_constant), or None."""
+        while node.__class__ is ParenthesizedExpression:
+            node = node.expr
+        cls = node.__class__
+        if cls is IntLiteral:
+            return node if _INT_MIN <= node.value <= _INT_MAX else None
+        if cls is BoolLiteral:
+            return node
+        if cls is BinaryOp or cls is UnaryOp:
+            return self._consts.get(id(node))
+        return None
+
+    def _fold_node(self, node):
+        """Fold one BinaryOp/UnaryOp whose operands have been folded already."""
+        if node.__class__ is UnaryOp:
+            operand = self._const_of(node.operand)
+            if operand is not None:
+                if operand.__class__ is IntLiteral and node.operator in ("-", "+"):
+                    return IntLiteral(_wrap_int(-operand.value if node.operator == "-" else operand.value))
+                if operand.__class__ is BoolLiteral and node.operator == "!":
+                    return BoolLiteral(not operand.value)
+            return None
+
+        left = self._const_of(node.left)
+        right = self._const_of(node.right) if left is not None else None
+        if right is None:
+            return None
+        op = node.operator
+        if left.__class__ is IntLiteral and right.__class__ is IntLiteral:
+            l, r = left.value, right.value
+            if op in _INT_FOLD:
+                return IntLiteral(_wrap_int(_INT_FOLD[op](l, r)))
+            if op in _REL_FOLD:
+                return BoolLiteral(_REL_FOLD[op](l, r))
+            if op in ("\\", "%") and r != 0:
+                # idiv/irem truncate toward zero
+                q = abs(l) // abs(r) * (1 if (l < 0) == (r < 0) else -1)
+                return IntLiteral(_wrap_int(q if op == "\\" else l - r * q))
+        elif left.__class__ is BoolLiteral and right.__class__ is BoolLiteral:
+            if op == "&&":
+                return BoolLiteral(left.value and right.value)
+            if op == "||":
+                return BoolLiteral(left.value or right.value)
+        return None
+
+    def _fold_constant(self, node):
+        """
+        Evaluate an int/boolean expression made only of literals at compile time.
+        Returns the resulting IntLiteral/BoolLiteral, or None when the expression
+        is not constant or folding could change what the JVM would do.
+        Every operator node below `node` is folded once, bottom-up, without recursion.
+        """
+        consts = self._consts
+        stack = [(node, False)]
+        while stack:
+            n, ready = stack.pop()
+            while n.__class__ is ParenthesizedExpression:
+                n = n.expr
+            cls = n.__class__
+            if (cls is not BinaryOp and cls is not UnaryOp) or id(n) in consts:
+                continue
+            if ready:
+                consts[id(n)] = self._fold_node(n)
+            elif cls is BinaryOp:
+                stack += ((n, True), (n.right, False), (n.left, False))
+            else:
+                stack += ((n, True), (n.operand, False))
+        return self._const_of(node)
+
+    def _walk_expr(self, root, o: Access):
+        """
+        Generate code for a tree of BinaryOp/UnaryOp/parentheses with an explicit
+        post-order stack instead of one visit() call per operator; operands that are
+        not operators (literals, identifiers, calls...) go through visit().
+        """
+        results = []  # (code, type) of finished operands, innermost last
+        stack = [(root, False)]
+        while stack:
+            node, ready = stack.pop()
+            if ready:
+                if node.__class__ is BinaryOp:
+                    rc, rt = results.pop()
+                    lc, lt = results.pop()
+                    results.append(self._emit_binary(node, lc, lt, rc, rt, o))
+                else:
+                    code, typ = results.pop()
+                    results.append(self._emit_unary(node, code, typ, o))
+                continue
+
+            while node.__class__ is ParenthesizedExpression:
+                node = node.expr
+            cls = node.__class__
+            if cls is BinaryOp or cls is UnaryOp:
+                # Literal-only int/boolean operands: push the result instead of computing it
+                folded = self._fold_constant(node)
+                if folded is None:
+                    if cls is BinaryOp:
+                        stack += ((node, True), (node.right, False), (node.left, False))
+                    else:
+                        stack += ((node, True), (node.operand, False))
+                    continue
+                node = folded
+            results.append(self.visit(node, o))
+        return results[0]
+
+    def _emit_binary(self, node: "BinaryOp", lc, lt, rc, rt, o: Access):
+        """Combine the code of both operands of a binary operation."""
         if node.operator in ["&&", "||"]:
             # Short-circuit logic
             res_label = o.frame.get_new_label()
             exit_label = o.frame.get_new_label()
-            code = lc
+            parts = [lc]
             if node.operator == "&&":
-                code += self.emit.emit_if_false(res_label, o.frame)
-                code += rc
-                code += self.emit.emit_goto(exit_label, o.frame)
-                code += self.emit.emit_label(res_label, o.frame)
-                code += self.emit.emit_push_iconst(0, o.frame)
+                parts.append(self.emit.emit_if_false(res_label, o.frame))
+                parts.append(rc)
+                parts.append(self.emit.emit_goto(exit_label, o.frame))
+                o.frame.pop()  # rc's value is already counted; the branches join
+                parts.append(self.emit.emit_label(res_label, o.frame))
+                parts.append(self.emit.emit_push_iconst(0, o.frame))
             else:
-                code += self.emit.emit_if_true(res_label, o.frame)
-                code += rc
-                code += self.emit.emit_goto(exit_label, o.frame)
-                code += self.emit.emit_label(res_label, o.frame)
-                code += self.emit.emit_push_iconst(1, o.frame)
-            code += self.emit.emit_label(exit_label, o.frame)
-            return code, PrimitiveType("boolean")
+                parts.append(self.emit.emit_if_true(res_label, o.frame))
+                parts.append(rc)
+                parts.append(self.emit.emit_goto(exit_label, o.frame))
+                o.frame.pop()  # rc's value is already counted; the branches join
+                parts.append(self.emit.emit_label(res_label, o.frame))
+                parts.append(self.emit.emit_push_iconst(1, o.frame))
+            parts.append(self.emit.emit_label(exit_label, o.frame))
+            return "".join(parts), _T_BOOL
 
         # Arithmetic and Relational
-        code = lc
-        if is_float_type(lt) and is_int_type(rt): rc += self.emit.emit_i2f(o.frame)
-        if is_int_type(lt) and is_float_type(rt): code += self.emit.emit_i2f(o.frame)
-        code += rc
+        parts = [lc]
+        l_float, r_float = is_float_type(lt), is_float_type(rt)
+        if l_float and is_int_type(rt): rc += self.emit.emit_i2f(o.frame)
+        if r_float and is_int_type(lt): parts.append(self.emit.emit_i2f(o.frame))
+        parts.append(rc)
         
-        res_type = PrimitiveType("float") if (is_float_type(lt) or is_float_type(rt) or node.operator == "/") else lt
+        res_type = _T_FLOAT if (l_float or r_float or node.operator == "/") else lt
         
-        if node.operator in ["+", "-"]: code += self.emit.emit_add_op(node.operator, res_type, o.frame)
-        elif node.operator in ["*", "/"]: code += self.emit.emit_mul_op(node.operator, res_type, o.frame)
-        elif node.operator == "\\": code += self.emit.emit_div(o.frame)
-        elif node.operator == "%": code += self.emit.emit_mod(o.frame)
+        if node.operator in ["+", "-"]: parts.append(self.emit.emit_add_op(node.operator, res_type, o.frame))
+        elif node.operator in ["*", "/"]: parts.append(self.emit.emit_mul_op(node.operator, res_type, o.frame))
+        elif node.operator == "\\": parts.append(self.emit.emit_div(o.frame))
+        elif node.operator == "%": parts.append(self.emit.emit_mod(o.frame))
         elif node.operator in [">", ">=", "<", "<=", "==", "!="]:
-            code += self.emit.emit_re_op(node.operator, lt if is_float_type(lt) or is_float_type(rt) else lt, o.frame)
-            res_type = PrimitiveType("boolean")
+            parts.append(self.emit.emit_re_op(node.operator, lt if l_float or r_float else lt, o.frame))
+            res_type = _T_BOOL
             
-        return code, res_type
+        return "".join(parts), res_type
+
+    def _emit_unary(self, node: "UnaryOp", code, typ, o: Access):
+        """Apply a unary operator to its operand's code."""
+        if node.operator == "-":
+            return code + self.emit.emit_neg_op(typ, o.frame), typ
+        elif node.operator == "!":
+            return code + self.emit.emit_not(_T_BOOL, o.frame), _T_BOOL
+        return code, typ
+
+    def visit_binary_op(self, node: "BinaryOp", o: Access = None):
+        """
+        Visit binary operation.
+        Implement binary operation code generation
+        """
+        return self._walk_expr(node, o)
 
     def visit_unary_op(self, node: "UnaryOp", o: Access = None):
         """
         Visit unary operation.
         Implement unary operation code generation
         """
-        code, typ = self.visit(node.operand, o)
-        if node.operator == "-":
-            return code + self.emit.emit_neg_op(typ, o.frame), typ
-        elif node.operator == "!":
-            return code + self.emit.emit_not(PrimitiveType("boolean"), o.frame), PrimitiveType("boolean")
-        return code, typ
+        return self._walk_expr(node, o)
 
     def visit_postfix_expression(self, node: "PostfixExpression", o: Access = None):
         """
         Visit postfix expression (method calls, member access, array access).
         Implement postfix expression code generation *
         """
-        code, typ = self.visit(node.operand, o)
-        if node.operator == "-":
-            return code + self.emit.emit_neg_op(typ, o.frame), typ
-        elif node.operator == "!":
-            return code + self.emit.emit_not(PrimitiveType("boolean"), o.frame), PrimitiveType("boolean")
-        return code, typ
+        primary, ops = node.primary, node.postfix_ops
+        parts = []
+        # io.writeInt(...): a name that is not a variable is the class of a static call
+        # and pushes nothing; visit_method_call resolves the method itself
+        if primary.__class__ is Identifier and ops and ops[0].__class__ is MethodCall \
+                and primary.name not in o.sym:
+            typ = None
+        else:
+            code, typ = self.visit(primary, o)
+            parts.append(code)
+
+        # Each op sees the type of everything to its left in o.is_first
+        outer_first = o.is_first
+        for op in ops:
+            o.is_first = typ
+            code, typ = self.visit(op, o)
+            parts.append(code)
+        o.is_first = outer_first
+        return "".join(parts), typ
     
     def visit_method_call(self, node: "MethodCall", o: Access = None):
         """
         Visit method call.
         Implement method call code generation *
         """
-        sym = next(filter(lambda x: x.name == node.method_name, o.sym), None)
+        # a.f(...): the receiver is already on the stack and o.is_first holds its type
+        if o.is_first.__class__ is ClassType:
+            return self._invoke_virtual(node, o.is_first, o)
+
+        sym = o.sym.get(node.method_name)
         if sym is None:
             raise IllegalOperandException(f"Undeclared variable: {node.method_name}")
 
         # Sinh mã để đẩy các đối số (arguments) lên stack
-        arg_code = ""
+        frame = o.frame
+        frame.enter_call()
+        arg_parts = []
+        arg_access = Access(frame, o.sym, False)
         for arg in node.args:
-            c, t = self.visit(arg, Access(o.frame, o.sym, False))
-            arg_code += c
+            c, t = self.visit(arg, arg_access)
+            arg_parts.append(c)
+        arg_code = "".join(arg_parts)
 
         # Gọi hàm tĩnh từ class 'io'
         if isinstance(sym.value, CName):
@@ -556,16 +771,53 @@ class CodeGenerator(ASTVisitor):
 
             # Ánh xạ int2str sang String.valueOf của Java để lấy kết quả "42"
             if mname == "int2str":
-                return arg_code + self.emit.emit_invoke_static(
-                    "java/lang/String/valueOf",
-                    FunctionType([PrimitiveType("int")], PrimitiveType("string")),
-                    o.frame
-                ), PrimitiveType("string")
+                code = arg_code + self.emit.emit_invoke_static(_INT2STR_NAME, _T_INT2STR, frame)
+                frame.exit_call(1)
+                return code, _T_STRING
+
+            lexeme = self._call_names.get((cname, mname))
+            if lexeme is None:
+                lexeme = self._call_names[cname, mname] = f"{cname}/{mname}"
+            invoke_code = self.emit.emit_invoke_static(lexeme, sym.type, frame)
+            return_type = sym.type.return_type
+            frame.exit_call(0 if is_void_type(return_type) else 1)
+            return arg_code + invoke_code, return_type
+
+        # No invoke is generated here: the arguments stay on the stack
+        frame.exit_call(len(node.args))
+        return arg_code, sym.type.return_type
 
-            invoke_code = self.emit.emit_invoke_static(f"{cname}/{mname}", sym.type, o.frame)
-            return arg_code + invoke_code, sym.type.return_type
+    def _find_method(self, class_name, method_name):
+        """(owner class, MethodDecl) of the method a call on class_name resolves to."""
+        key = (class_name, method_name)
+        if key not in self._virtual:
+            found = None
+            decl = self._class_decls.get(class_name)
+            while decl is not None and found is None:
+                for member in decl.members:
+                    if member.__class__ is MethodDecl and member.name == method_name:
+                        found = (decl.name, member)
+                        break
+                decl = self._class_decls.get(decl.superclass)
+            self._virtual[key] = found
+        return self._virtual[key]
+
+    def _invoke_virtual(self, node: "MethodCall", receiver, o: Access):
+        """Call an instance method on the receiver pushed by the code to its left."""
+        found = self._find_method(receiver.class_name, node.method_name)
+        if found is None or found[1].is_static:
+            raise IllegalOperandException(f"Undeclared method: {node.method_name}")
+        owner, method = found
 
-        return arg_code, sym.type.return_type
+        frame = o.frame
+        frame.enter_call()
+        arg_access = Access(frame, o.sym, False)
+        arg_code = "".join([self.visit(arg, arg_access)[0] for arg in node.args])
+        mtype = FunctionType([p.param_type for p in method.params], method.return_type)
+        invoke_code = self.emit.emit_invoke_virtual(f"{owner}/{method.name}", mtype, frame)
+        # The receiver sits just below the call's base and is consumed by the invoke
+        frame.exit_call((0 if is_void_type(method.return_type) else 1) - 1)
+        return arg_code + invoke_code, method.return_type
 
     def visit_member_access(self, node: "MemberAccess", o: Access = None):
         """
@@ -581,8 +833,11 @@ class CodeGenerator(ASTVisitor):
         Visit array access.
         Implement array access code generation
         """
-        idx_code, _ = self.visit(node.index, Access(o.frame, o.sym))
-        elem_type = o.is_first.element_type
+        # The index is a plain read: visit it with o's flags cleared, then put them back
+        is_left, base_type = o.is_left, o.is_first
+        idx_code, _ = self.visit(node.index, o.reset())
+        o.reset(is_left, base_type)
+        elem_type = base_type.element_type
         return idx_code + self.emit.emit_aload(elem_type, o.frame), elem_type
 
     def visit_object_creation(self, node: "ObjectCreation", o: Access = None):
@@ -590,16 +845,21 @@ class CodeGenerator(ASTVisitor):
         Visit object creation.
         Implement object creation code generation *
         """
-        code = self.emit.jvm.emitNEW(node.class_name)
-        code += self.emit.emit_dup(o.frame)
+        o.frame.enter_call()
+        parts = [self.emit.jvm.emitNEW(node.class_name)]
+        parts.append(self.emit.emit_dup(o.frame))
         o.frame.push() # new pushes obj
         arg_types = []
+        arg_access = Access(o.frame, o.sym)
         for arg in node.args:
-            ac, at = self.visit(arg, Access(o.frame, o.sym))
-            code += ac
+            ac, at = self.visit(arg, arg_access)
+            parts.append(ac)
             arg_types.append(at)
-        code += self.emit.emit_invoke_special(o.frame, f"{node.class_name}/<init>", FunctionType(arg_types, PrimitiveType("void")))
-        return code, ClassType(node.class_name)
+        init_type = FunctionType(arg_types, _T_VOID) if arg_types else _T_DEFAULT_INIT
+        parts.append(self.emit.emit_invoke_special(o.frame, f"{node.class_name}/<init>", init_type))
+        # <init> leaves the new object's first reference
+        o.frame.exit_call(1)
+        return "".join(parts), ClassType(node.class_name)
 
 
     def visit_identifier(self, node: "Identifier", o: Access = None):
@@ -610,15 +870,12 @@ class CodeGenerator(ASTVisitor):
             return "", None
 
         # Find symbol
-        sym = next(filter(lambda x: x.name == node.name, o.sym), None)
+        sym = o.sym.get(node.name)
         if sym is None:
             raise IllegalOperandException(f"Undeclared identifier: {node.name}")
 
-        if type(sym.value) is Index:
-            code = self.emit.emit_read_var(
-                sym.name, sym.type, sym.value.value, o.frame
-            )
-            return code, sym.type
+        if sym.is_local:
+            return self._read_local(sym, o.frame), sym.type
         return "", sym.type
 
     def visit_this_expression(self, node: "ThisExpression", o: Access = None):
@@ -629,15 +886,12 @@ class CodeGenerator(ASTVisitor):
             return "", None
         
         # Find 'this' in symbol table (should be at index 0 for instance methods)
-        this_sym = next(filter(lambda x: x.name == "this", o.sym), None)
+        this_sym = o.sym.get("this")
         if this_sym is None:
             raise IllegalOperandException("'this' not available in static context")
         
-        if type(this_sym.value) is Index:
-            code = self.emit.emit_read_var(
-                "this", this_sym.type, this_sym.value.value, o.frame
-            )
-            return code, this_sym.type
+        if this_sym.is_local:
+            return self._read_local(this_sym, o.frame), this_sym.type
         else:
             raise IllegalOperandException("Invalid 'this' reference")
 
@@ -647,7 +901,11 @@ class CodeGenerator(ASTVisitor):
         """
         Visit parenthesized expression - just visit inner expression.
         """
-        return self.visit(node.expr, o)
+        # ((x)) etc.: peel every paren layer here rather than dispatching once per layer
+        expr = node.expr
+        while expr.__class__ is ParenthesizedExpression:
+            expr = expr.expr
+        return self.visit(expr, o)
 
     # ============================================================================
     # Literals
@@ -659,8 +917,8 @@ class CodeGenerator(ASTVisitor):
         """
         if o is None:
             return "", None
-        code = self.emit.emit_push_iconst(node.value, o.frame)
-        return code, PrimitiveType("int")
+        o.frame.push()
+        return _push_int(node.value), _T_INT
 
     def visit_float_literal(self, node: "FloatLiteral", o: Access = None):
         """
@@ -669,7 +927,7 @@ class CodeGenerator(ASTVisitor):
         if o is None:
             return "", None
         code = self.emit.emit_push_fconst(str(node.value), o.frame)
-        return code, PrimitiveType("float")
+        return code, _T_FLOAT
 
     def visit_bool_literal(self, node: "BoolLiteral", o: Access = None):
         """
@@ -679,7 +937,7 @@ class CodeGenerator(ASTVisitor):
             return "", None
         value_str = "1" if node.value else "0"
         code = self.emit.emit_push_iconst(value_str, o.frame)
-        return code, PrimitiveType("boolean")
+        return code, _T_BOOL
 
     def visit_string_literal(self, node: "StringLiteral", o: Access = None):
         """
@@ -687,8 +945,13 @@ class CodeGenerator(ASTVisitor):
         """
         if o is None:
             return "", None
-        code = self.emit.emit_push_const('"' + node.value + '"', PrimitiveType("string"), o.frame)
-        return code, PrimitiveType("string")
+        # Quoted and formatted once per distinct literal in the class
+        o.frame.push()
+        pool = self.emit.sconst_pool
+        code = pool.get(node.value)
+        if code is None:
+            code = pool[node.value] = _LDC('"' + node.value + '"')
+        return code, _T_STRING
 
     def visit_array_literal(self, node: "ArrayLiteral", o: Access = None):
         """
@@ -696,21 +959,55 @@ class CodeGenerator(ASTVisitor):
          Implement array literal code generation
         """
         # OPLang Array Literal: {1, 2, 3}
-        code = self.emit.emit_push_iconst(len(node.value), o.frame)
-        elem_type = PrimitiveType("int") # Default or infer
+        values = node.value
+        if values:
+            cls = values[0].__class__
+            if (cls is IntLiteral or cls is FloatLiteral) and all(v.__class__ is cls for v in values):
+                return self._literal_array(values, cls, o.frame)
+
+        parts = [self.emit.emit_push_iconst(len(node.value), o.frame)]
+        elem_type = _T_INT # Default or infer
         if len(node.value) > 0:
             _, elem_type = self.visit(node.value[0], o)
             # Pop result of inference visit if needed
             o.frame.pop()
             
-        code += self.emit.emit_new_array(self.emit.get_full_type(elem_type))
+        parts.append(self.emit.emit_new_array(self.emit.get_full_type(elem_type)))
         for i, val in enumerate(node.value):
-            code += self.emit.emit_dup(o.frame)
-            code += self.emit.emit_push_iconst(i, o.frame)
+            parts.append(self.emit.emit_dup(o.frame))
+            parts.append(self.emit.emit_push_iconst(i, o.frame))
             vc, _ = self.visit(val, o)
-            code += vc
-            code += self.emit.emit_astore(elem_type, o.frame)
-        return code, ArrayType(elem_type, len(node.value))
+            parts.append(vc)
+            parts.append(self.emit.emit_astore(elem_type, o.frame))
+        return "".join(parts), ArrayType(elem_type, len(node.value))
+
+    def _literal_array(self, values, cls, frame):
+        """
+        {1, 2, 3} / {1.0, 2.5}: every element is a literal of one type, so each store's
+        pushes are written directly instead of visiting the elements.
+        """
+        emit = self.emit
+        jvm = emit.jvm
+        elem_type = _T_INT if cls is IntLiteral else _T_FLOAT
+        parts = [emit.emit_push_iconst(len(values), frame), emit.emit_new_array(emit.get_full_type(elem_type))]
+
+        # Each store pushes the array's copy, the index and the value, then pops all three
+        push, adjust_stack = frame.push, frame.adjust_stack
+        dup = jvm.emitDUP()
+        if cls is IntLiteral:
+            store = jvm.emitIASTORE()
+            for i, val in enumerate(values):
+                parts += (dup, _push_int(i), _push_int(val.value), store)
+                push(); push(); push()
+                adjust_stack(-3)
+        else:
+            store = jvm.emitFASTORE()
+            push_fconst = emit.emit_push_fconst
+            for i, val in enumerate(values):
+                push(); push()
+                parts += (dup, _push_int(i), push_fconst(str(val.value), frame), store)
+                adjust_stack(-3)
+        return "".join(parts), ArrayType(elem_type, len(values))
 
     def visit_nil_literal(self, node: "NilLiteral", o: Access = None):
         """
@@ -722,12 +1019,14 @@ class CodeGenerator(ASTVisitor):
         code = self.emit.jvm.emitPUSHNULL()
         return code, None  # Type will be determined by context
 
-    # def visit_method_invocation(self, node: "MethodInvocation", o: Any = None):
-    #     pass
+    # The AST generator builds every call and member access as a PostfixExpression,
+    # so these nodes never reach code generation
+    def visit_method_invocation(self, node: "MethodInvocation", o: Access = None):
+        raise IllegalOperandException("Unsupported node: MethodInvocation")
 
-    # def visit_static_method_invocation(self, node: "StaticMethodInvocation", o: Any = None):
-    #     pass
+    def visit_static_method_invocation(self, node: "StaticMethodInvocation", o: Access = None):
+        raise IllegalOperandException("Unsupported node: StaticMethodInvocation")
 
-    # def visit_static_member_access(self, node: "StaticMemberAccess", o: Any = None):
-    #     pass
+    def visit_static_member_access(self, node: "StaticMemberAccess", o: Access = None):
+        raise IllegalOperandException("Unsupported node: StaticMemberAccess")
 
@@ -1,30 +1,87 @@
 import os
+from functools import lru_cache
 from typing import List, Optional, Union
 from .jasmin_code import JasminCode
 from .error import IllegalOperandException
 from ..utils.nodes import *
 from .utils import *
 
+# Default directory for emitted .j files (src/runtime, next to io.class and jasmin.jar)
+_RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "runtime")
+
+# Shared primitive types for the code generator (codegen, io); types are never mutated.
+# The is_*_type checks below test identity with these first and only compare names
+# for types built elsewhere (the AST's declared types)
+_T_INT = PrimitiveType("int")
+_T_FLOAT = PrimitiveType("float")
+_T_BOOL = PrimitiveType("boolean")
+_T_STRING = PrimitiveType("string")
+_T_VOID = PrimitiveType("void")
+
 # Helper functions for OPLang type checking
 def is_int_type(in_type):
     """Check if type is int primitive."""
-    return type(in_type) is PrimitiveType and in_type.type_name == "int"
+    return in_type is _T_INT or (type(in_type) is PrimitiveType and in_type.type_name == "int")
 
 def is_float_type(in_type):
     """Check if type is float primitive."""
-    return type(in_type) is PrimitiveType and in_type.type_name == "float"
+    return in_type is _T_FLOAT or (type(in_type) is PrimitiveType and in_type.type_name == "float")
 
 def is_string_type(in_type):
     """Check if type is string primitive."""
-    return type(in_type) is PrimitiveType and in_type.type_name == "string"
+    return in_type is _T_STRING or (type(in_type) is PrimitiveType and in_type.type_name == "string")
 
 def is_bool_type(in_type):
     """Check if type is boolean primitive."""
-    return type(in_type) is PrimitiveType and in_type.type_name == "boolean"
+    return in_type is _T_BOOL or (type(in_type) is PrimitiveType and in_type.type_name == "boolean")
 
 def is_void_type(in_type):
     """Check if type is void primitive."""
-    return type(in_type) is PrimitiveType and in_type.type_name == "void"
+    return in_type is _T_VOID or (type(in_type) is PrimitiveType and in_type.type_name == "void")
+
+
+# Type -> descriptor / full name, memoized by type object across classes: declared
+# primitive types are shared by the AST, and a symbol's type object is reused at each use
+@lru_cache(maxsize=256)
+def _jvm_type(in_type):
+    type_in = type(in_type)
+    if is_int_type(in_type):
+        return "I"
+    elif is_float_type(in_type):
+        return "F"
+    elif is_string_type(in_type):
+        return "Ljava/lang/String;"
+    elif is_bool_type(in_type):
+        return "Z"
+    elif is_void_type(in_type):
+        return "V"
+    elif type_in is ArrayType:
+        return "[" + _jvm_type(in_type.element_type)
+    elif type_in is FunctionType:
+        return (
+            "("
+            + "".join(map(_jvm_type, in_type.param_types))
+            + ")"
+            + _jvm_type(in_type.return_type)
+        )
+    elif type_in is ClassType:
+        return "L" + in_type.class_name + ";"
+    elif type_in is ReferenceType:
+        # Reference type has same JVM representation as referenced type
+        return _jvm_type(in_type.referenced_type)
+
+@lru_cache(maxsize=256)
+def _full_type(in_type):
+    if is_int_type(in_type):
+        return "int"
+    elif is_float_type(in_type):
+        return "float"
+    elif is_string_type(in_type):
+        return "java/lang/String"
+    elif is_void_type(in_type):
+        return "void"
+    elif type(in_type) is PrimitiveType:
+        return in_type.type_name
 
 
 class Emitter:
@@ -36,24 +93,38 @@ class Emitter:
 
     Attributes:
         filename (str): Name of the output file
+        filepath (str): Path of the .j file written by emit_epilog
         buff (List[str]): Buffer to store generated code
         jvm (JasminCode): JasminCode instance for JVM instruction generation
+        iconst_pool (dict): int constant -> push instruction already generated
+        fconst_pool (dict): float lexeme -> push instruction already generated
+        sconst_pool (dict): string literal value -> ldc instruction already generated
     """
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, output_dir: Optional[str] = None):
         """
         Initialize Emitter.
 
         Args:
             filename: Name of the output file
+            output_dir: Directory the .j file is written to (defaults to src/runtime)
         """
 
         self.filename = filename
-        self.filepath = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), "runtime", filename
-        )
-        self.buff: List[str] = []
+        if output_dir is None:
+            output_dir = _RUNTIME_DIR
+        self.filepath = os.path.join(output_dir, filename)
+        # Emitted code is collected here and written to the .j file in one go by emit_epilog
+        self.buff = []
+        # print_out(code) appends code to the output; bound straight to list.append
+        # so each emitted fragment costs one C call, not an extra Python frame
+        self.print_out = self.buff.append
         self.jvm = JasminCode()
+        # Literal pools: constant value -> push instruction, so a literal repeated
+        # across the class is formatted once
+        self.iconst_pool = {}
+        self.fconst_pool = {}
+        self.sconst_pool = {}
 
     def get_jvm_type(self, in_type) -> str:
         """
@@ -65,33 +136,7 @@ class Emitter:
         Returns:
             JVM type descriptor string
         """
-        type_in = type(in_type)
-        if is_int_type(in_type):
-            return "I"
-        elif is_float_type(in_type):
-            return "F"
-        elif is_string_type(in_type):
-            return "Ljava/lang/String;"
-        elif is_bool_type(in_type):
-            return "Z"
-        elif is_void_type(in_type):
-            return "V"
-        elif type_in is ArrayType:
-            return "[" + self.get_jvm_type(in_type.element_type)
-        elif type_in is FunctionType:
-            return (
-                "("
-                + "".join(
-                    list(map(lambda x: self.get_jvm_type(x), in_type.param_types))
-                )
-                + ")"
-                + self.get_jvm_type(in_type.return_type)
-            )
-        elif type_in is ClassType:
-            return "L" + in_type.class_name + ";"
-        elif type_in is ReferenceType:
-            # Reference type has same JVM representation as referenced type
-            return self.get_jvm_type(in_type.referenced_type)
+        return _jvm_type(in_type)
 
     def get_full_type(self, in_type) -> str:
         """
@@ -103,16 +148,7 @@ class Emitter:
         Returns:
             Full type name string
         """
-        if is_int_type(in_type):
-            return "int"
-        elif is_float_type(in_type):
-            return "float"
-        elif is_string_type(in_type):
-            return "java/lang/String"
-        elif is_void_type(in_type):
-            return "void"
-        elif type(in_type) is PrimitiveType:
-            return in_type.type_name
+        return _full_type(in_type)
 
     def emit_push_iconst(self, in_: Union[int, str], frame) -> str:
         """
@@ -125,24 +161,25 @@ class Emitter:
         Returns:
             Generated JVM instruction string
         """
+        if type(in_) is str:
+            # Convert first: recursing would count the push twice
+            in_ = 1 if in_ == "true" else 0 if in_ == "false" else int(in_)
         frame.push()
         if type(in_) is int:
             i = in_
+            code = self.iconst_pool.get(i)
+            if code is not None:
+                return code
             if i >= -1 and i <= 5:
-                return self.jvm.emitICONST(i)
+                code = self.jvm.emitICONST(i)
             elif i >= -128 and i <= 127:
-                return self.jvm.emitBIPUSH(i)
+                code = self.jvm.emitBIPUSH(i)
             elif i >= -32768 and i <= 32767:
-                return self.jvm.emitSIPUSH(i)
-            else:
-                return self.jvm.emitLDC(str(i))
-        elif type(in_) is str:
-            if in_ == "true":
-                return self.emit_push_iconst(1, frame)
-            elif in_ == "false":
-                return self.emit_push_iconst(0, frame)
+                code = self.jvm.emitSIPUSH(i)
             else:
-                return self.emit_push_iconst(int(in_), frame)
+                code = self.jvm.emitLDC(str(i))
+            self.iconst_pool[i] = code
+            return code
 
     def emit_push_fconst(self, in_: str, frame) -> str:
         """
@@ -155,13 +192,18 @@ class Emitter:
         Returns:
             Generated JVM instruction string
         """
-        f = float(in_)
         frame.push()
+        code = self.fconst_pool.get(in_)
+        if code is not None:
+            return code
+        f = float(in_)
         rst = "{0:.4f}".format(f)
         if rst == "0.0000" or rst == "1.0000" or rst == "2.0000":
-            return self.jvm.emitFCONST(rst[:3])
+            code = self.jvm.emitFCONST(rst[:3])
         else:
-            return self.jvm.emitLDC(rst)
+            code = self.jvm.emitLDC(rst)
+        self.fconst_pool[in_] = code
+        return code
 
     def emit_push_const(self, in_: str, typ, frame) -> str:
         """
@@ -228,9 +270,7 @@ class Emitter:
         Raises:
             IllegalOperandException: If type is not supported
         """
-        frame.pop()
-        frame.pop()
-        frame.pop()
+        frame.adjust_stack(-3)
         if is_int_type(in_):
             return self.jvm.emitIASTORE()
         elif is_float_type(in_):
@@ -292,6 +332,31 @@ class Emitter:
         else:
             raise IllegalOperandException(name)
 
+    def get_local_codes(self, in_type, index: int) -> tuple:
+        """
+        Build the load and store instructions of a local variable once, for reuse
+        on every read and write of it; the frame is not touched.
+
+        Args:
+            in_type: Variable type
+            index: Variable index
+
+        Returns:
+            Tuple of (load, store) instruction strings, or (None, None) if the type
+            is not supported by emit_read_var/emit_write_var
+        """
+        if is_int_type(in_type):
+            return self.jvm.emitILOAD(index), self.jvm.emitISTORE(index)
+        elif is_float_type(in_type):
+            return self.jvm.emitFLOAD(index), self.jvm.emitFSTORE(index)
+        elif (
+            type(in_type) is ArrayType
+            or type(in_type) is ClassType
+            or is_string_type(in_type)
+        ):
+            return self.jvm.emitALOAD(index), self.jvm.emitASTORE(index)
+        return None, None
+
     def emit_read_var2(self, name: str, typ, frame) -> str:
         """
         Generate the second instruction for array cell access.
@@ -430,8 +495,7 @@ class Emitter:
         Returns:
             Generated JVM instruction string
         """
-        frame.pop()
-        frame.pop()
+        frame.adjust_stack(-2)
         return self.jvm.emitPUTFIELD(lexeme, self.get_jvm_type(in_))
 
     def emit_invoke_static(self, lexeme: str, in_, frame) -> str:
@@ -447,7 +511,7 @@ class Emitter:
             Generated JVM instruction string
         """
         typ = in_
-        list(map(lambda x: frame.pop(), typ.param_types))
+        frame.adjust_stack(-len(typ.param_types))
         if not is_void_type(typ.return_type):
             frame.push()
         return self.jvm.emitINVOKESTATIC(lexeme, self.get_jvm_type(in_))
@@ -466,8 +530,7 @@ class Emitter:
         """
         if not lexeme is None and not in_ is None:
             typ = in_
-            list(map(lambda x: frame.pop(), typ.param_types))
-            frame.pop()
+            frame.adjust_stack(-len(typ.param_types) - 1)
             if not is_void_type(typ.return_type):
                 frame.push()
             return self.jvm.emitINVOKESPECIAL(lexeme, self.get_jvm_type(in_))
@@ -488,8 +551,7 @@ class Emitter:
             Generated JVM instruction string
         """
         typ = in_
-        list(map(lambda x: frame.pop(), typ.param_types))
-        frame.pop()
+        frame.adjust_stack(-len(typ.param_types) - 1)
         if not is_void_type(typ.return_type):
             frame.push()
         return self.jvm.emitINVOKEVIRTUAL(lexeme, self.get_jvm_type(in_))
@@ -527,6 +589,8 @@ class Emitter:
         result.append(self.emit_if_true(label1, frame))
         result.append(self.emit_push_const("true", in_, frame))
         result.append(self.emit_goto(label2, frame))
+        # The false branch starts from the height before the 1 was pushed
+        frame.pop()
         result.append(self.emit_label(label1, frame))
         result.append(self.emit_push_const("false", in_, frame))
         result.append(self.emit_label(label2, frame))
@@ -648,8 +712,7 @@ class Emitter:
         label_f = frame.get_new_label()
         label_o = frame.get_new_label()
 
-        frame.pop()
-        frame.pop()
+        frame.adjust_stack(-2)
         if is_int_type(in_):
             if op == ">":
                 result.append(self.jvm.emitIFICMPLE(label_f))
@@ -677,12 +740,12 @@ class Emitter:
                 result.append(self.jvm.emitIFEQ(label_f))
             else:
                 result.append(self.jvm.emitIFNE(label_f))
-        from ..utils.nodes import PrimitiveType
-        result.append(self.emit_push_const("1", PrimitiveType("int"), frame))
-        frame.push()
+        result.append(self.emit_push_const("1", _T_INT, frame))
         result.append(self.emit_goto(label_o, frame))
+        # The false branch starts from the height before the 1 was pushed
+        frame.pop()
         result.append(self.emit_label(label_f, frame))
-        result.append(self.emit_push_const("0", PrimitiveType("int"), frame))
+        result.append(self.emit_push_const("0", _T_INT, frame))
         result.append(self.emit_label(label_o, frame))
         return "".join(result)
 
@@ -704,8 +767,7 @@ class Emitter:
         """
         result = list()
 
-        frame.pop()
-        frame.pop()
+        frame.adjust_stack(-2)
         if op == ">":
             result.append(self.jvm.emitIFICMPLE(false_label))
             result.append(self.emit_goto(true_label))
@@ -752,6 +814,24 @@ class Emitter:
         buffer.append(self.jvm.emitENDMETHOD())
         return "".join(buffer)
 
+    def finish_method(self, to_label: int, frame) -> None:
+        """
+        Write the end of a method in one piece: its end label, the .var directives
+        collected in frame.pending_vars, the .limit directives and .end method.
+
+        Args:
+            to_label: The label closing the method body
+            frame: FrozenFrame of the method (see Frame.finalize)
+        """
+        jvm = self.jvm
+        emit_var = self.emit_var
+        buffer = [jvm.emitLABEL(to_label)]
+        buffer += [emit_var(*entry) for entry in frame.pending_vars]
+        buffer.append(jvm.emitLIMITSTACK(frame.max_op_stack_size))
+        buffer.append(jvm.emitLIMITLOCAL(frame.max_index))
+        buffer.append(jvm.emitENDMETHOD())
+        self.print_out("".join(buffer))
+
     def get_const(self, ast) -> tuple:
         """
         Get constant value and type from AST.
@@ -762,9 +842,8 @@ class Emitter:
         Returns:
             Tuple of (value, type)
         """
-        from ..utils.nodes import PrimitiveType
         if type(ast) is IntLiteral:
-            return (str(ast.value), PrimitiveType("int"))
+            return (str(ast.value), _T_INT)
 
     def emit_if_true(self, label: int, frame) -> str:
         """
@@ -966,24 +1045,13 @@ class Emitter:
 
     def emit_epilog(self) -> None:
         """
-        Write generated code to file.
-        """
-        file = open(self.filepath, "w")
-        tmp = "".join(self.buff)
-        file.write(tmp)
-        file.close()
-
-    def print_out(self, in_: str) -> None:
-        """
-        Print out the code to screen.
-
-        Args:
-            in_: The code to be printed out
+        Write the generated code to file with a single write.
         """
-        self.buff.append(in_)
+        with open(self.filepath, "w") as file:
+            file.write("".join(self.buff))
 
     def clear_buff(self) -> None:
         """
-        Clear the code buffer.
+        Discard the code emitted so far.
         """
         self.buff.clear()
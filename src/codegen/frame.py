@@ -1,3 +1,5 @@
+from array import array
+from collections import namedtuple
 from typing import List, Optional
 from .error import IllegalRuntimeException
 # Công cụ dùng để theo dõi trạng thái của khung ngăn xếp khi tạo mã máy cho một phương thức cụ thể.
@@ -21,6 +23,20 @@ from .error import IllegalRuntimeException
 # thì xử lý rẽ nhánh trước rồi ngay lặp tức quay lại với trục chính
 # bước 4: từ mã giả ở bước 3 viết mã thật
 
+# Initial number of nested scopes / loops the frame's label stacks have room for
+_STACK_INIT = 8
+
+# True: every pop checks for an empty operand stack. False: pops only count down; an
+# underflow is reported by the next push, or when the method's outermost scope is exited.
+# Read when a Frame is created, so it can be switched at any time for later frames
+DEBUG_FRAME = False
+
+# What is left of a Frame once its method has been generated: everything the method's
+# closing directives need (see Frame.finalize, Emitter.finish_method), with no live state
+FrozenFrame = namedtuple(
+    "FrozenFrame", "name return_type max_op_stack_size max_index pending_vars"
+)
+
 
 class Frame:
     """
@@ -34,12 +50,31 @@ class Frame:
         max_op_stack_size (int): Maximum size of operand stack
         curr_index (int): Current index of local variable
         max_index (int): Maximum index used
-        start_label (List[int]): Stack containing start labels of scopes
-        end_label (List[int]): Stack containing end labels of scopes
-        index_local (List[int]): Stack containing local indices of scopes
-        con_label (List[int]): Stack containing continue labels of loops
-        brk_label (List[int]): Stack containing break labels of loops
+        scopes (array): Stack of scopes, 3 ints each: start label, end label, saved local index
+        scope_top (int): Number of scopes on the stack
+        loops (array): Stack of loops, 2 ints each: continue label, break label
+        loop_top (int): Number of loops on the stack
+        call_bases (List[int]): Operand stack size at the start of each call being generated
+        pending_vars (List[tuple]): .var entries (index, name, type, from, to) written at method end
+        pop: _pop_checked or _pop_unchecked, chosen by DEBUG_FRAME when the frame is created
     """
+
+    __slots__ = (
+        "name",
+        "return_type",
+        "current_label",
+        "curr_op_stack_size",
+        "max_op_stack_size",
+        "curr_index",
+        "max_index",
+        "scopes",
+        "scope_top",
+        "loops",
+        "loop_top",
+        "call_bases",
+        "pending_vars",
+        "pop",
+    )
     
     def __init__(self, name: str, return_type):
         """
@@ -56,11 +91,14 @@ class Frame:
         self.max_op_stack_size = 0
         self.curr_index = 0
         self.max_index = 0
-        self.start_label: List[int] = []
-        self.end_label: List[int] = []
-        self.index_local: List[int] = []
-        self.con_label: List[int] = []
-        self.brk_label: List[int] = []
+        # Preallocated int stacks, doubled when full
+        self.scopes = array("i", [0]) * (3 * _STACK_INIT)
+        self.scope_top = 0
+        self.loops = array("i", [0]) * (2 * _STACK_INIT)
+        self.loop_top = 0
+        self.call_bases: List[int] = []
+        self.pending_vars: List[tuple] = []
+        self.pop = self._pop_checked if DEBUG_FRAME else self._pop_unchecked
 
     def get_curr_index(self) -> int:
         """Return current index."""
@@ -82,19 +120,26 @@ class Frame:
         Returns:
             An integer representing the label.
         """
-        tmp = self.current_label
-        self.current_label = self.current_label + 1
-        return tmp
+        label = self.current_label
+        self.current_label = label + 1
+        return label
 
     def push(self) -> None:
         """
         Simulate an instruction that pushes a value onto operand stack.
+        
+        Raises:
+            IllegalRuntimeException: When an earlier unchecked pop left the stack below empty
         """
-        self.curr_op_stack_size = self.curr_op_stack_size + 1
-        if self.max_op_stack_size < self.curr_op_stack_size:
-            self.max_op_stack_size = self.curr_op_stack_size
+        size = self.curr_op_stack_size
+        if size < 0:
+            raise IllegalRuntimeException("Pop empty stack")
+        size += 1
+        self.curr_op_stack_size = size
+        if self.max_op_stack_size < size:
+            self.max_op_stack_size = size
 
-    def pop(self) -> None:
+    def _pop_checked(self) -> None:
         """
         Simulate an instruction that pops a value out of operand stack.
         
@@ -105,6 +150,54 @@ class Frame:
         if self.curr_op_stack_size < 0:
             raise IllegalRuntimeException("Pop empty stack")
 
+    def _pop_unchecked(self) -> None:
+        """
+        Simulate an instruction that pops a value out of operand stack.
+        Underflow is reported by the next push, or by exit_scope for the whole method.
+        """
+        self.curr_op_stack_size -= 1
+
+    def adjust_stack(self, delta: int) -> None:
+        """
+        Simulate the net stack effect of one or more instructions in a single step,
+        e.g. -3 for an array store or -(n + 1) for a virtual call with n arguments.
+        
+        Args:
+            delta: Number of values pushed (positive) or popped (negative)
+        
+        Raises:
+            IllegalRuntimeException: When more values are popped than the stack holds,
+                now or by an earlier unchecked pop
+        """
+        size = self.curr_op_stack_size
+        if size < 0 or size + delta < 0:
+            raise IllegalRuntimeException("Pop empty stack")
+        size += delta
+        self.curr_op_stack_size = size
+        if size > self.max_op_stack_size:
+            self.max_op_stack_size = size
+
+    def enter_call(self) -> None:
+        """
+        Invoked before generating a call (receiver/arguments, then the invoke):
+        remembers the operand stack size the call starts from.
+        """
+        self.call_bases.append(self.curr_op_stack_size)
+
+    def exit_call(self, return_arity: int) -> None:
+        """
+        Invoked after a call's invoke instruction. The call must leave exactly
+        return_arity values on top of the stack it started from.
+        
+        Args:
+            return_arity: Number of values the call leaves on the stack
+        
+        Raises:
+            IllegalRuntimeException: When the stack size is anything else
+        """
+        if self.curr_op_stack_size != self.call_bases.pop() + return_arity:
+            raise IllegalRuntimeException("Call stack effect mismatch")
+
     def get_stack_size(self) -> int:
         """Return current stack size."""
         return self.curr_op_stack_size
@@ -128,7 +221,7 @@ class Frame:
         if self.curr_op_stack_size != 0:
             raise IllegalRuntimeException("Stack not empty")
 
-    def enter_scope(self, is_proc: bool) -> None:
+    def enter_scope(self, is_proc: bool) -> tuple:
         """
         Invoked when parsing into a new scope inside a method.
         
@@ -139,31 +232,44 @@ class Frame:
         
         Args:
             is_proc: Boolean indicating whether this is a procedure
-        """
-        start = self.get_new_label()
-        end = self.get_new_label()
-        self.start_label.append(start)
-        self.end_label.append(end)
-        self.index_local.append(self.curr_index)
+        
+        Returns:
+            The (start, end) labels, so the caller need not fetch them again
+        """
+        # Both labels in one counter bump: start, then end = start + 1
+        start = self.current_label
+        self.current_label = start + 2
+        scopes = self.scopes
+        i = 3 * self.scope_top
+        if i == len(scopes):
+            scopes.extend(scopes)
+        scopes[i] = start
+        scopes[i + 1] = start + 1
+        scopes[i + 2] = self.curr_index
+        self.scope_top += 1
         if is_proc:
             self.max_op_stack_size = 0
             self.max_index = 0
+        return start, start + 1
 
     def exit_scope(self) -> None:
         """
         Invoked when parsing out of a scope in a method.
         
         This method will pop the starting and ending labels of this scope
-        and restore the current index.
+        and restore the current index. Leaving the method's outermost scope
+        also verifies that no more values were popped than pushed.
         
         Raises:
-            IllegalRuntimeException: When there is an error exiting scope
+            IllegalRuntimeException: When there is an error exiting scope,
+                or the operand stack was popped empty
         """
-        if not self.start_label or not self.end_label or not self.index_local:
+        if not self.scope_top:
             raise IllegalRuntimeException("Error when exit scope")
-        self.start_label.pop()
-        self.end_label.pop()
-        self.curr_index = self.index_local.pop()
+        self.scope_top -= 1
+        self.curr_index = self.scopes[3 * self.scope_top + 2]
+        if not self.scope_top and self.curr_op_stack_size < 0:
+            raise IllegalRuntimeException("Pop empty stack")
 
     def get_start_label(self) -> int:
         """
@@ -175,9 +281,9 @@ class Frame:
         Raises:
             IllegalRuntimeException: When there is no start label
         """
-        if not self.start_label:
+        if not self.scope_top:
             raise IllegalRuntimeException("None start label")
-        return self.start_label[-1]
+        return self.scopes[3 * self.scope_top - 3]
 
     def get_end_label(self) -> int:
         """
@@ -189,9 +295,9 @@ class Frame:
         Raises:
             IllegalRuntimeException: When there is no end label
         """
-        if not self.end_label:
+        if not self.scope_top:
             raise IllegalRuntimeException("None end label")
-        return self.end_label[-1]
+        return self.scopes[3 * self.scope_top - 2]
 
     def get_new_index(self) -> int:
         """
@@ -215,18 +321,42 @@ class Frame:
         """
         return self.max_index
 
-    def enter_loop(self) -> None:
+    def finalize(self) -> FrozenFrame:
+        """
+        Snapshot the frame once its method body has been generated.
+        
+        Returns:
+            FrozenFrame with the method's stack/locals limits and .var entries
+        """
+        return FrozenFrame(
+            self.name,
+            self.return_type,
+            self.max_op_stack_size,
+            self.max_index,
+            tuple(self.pending_vars),
+        )
+
+    def enter_loop(self) -> tuple:
         """
         Invoked when parsing into a loop statement.
         
         This method creates 2 new labels that represent the starting and ending
         labels of the loop. These labels are pushed onto corresponding stacks
         and can be retrieved by get_continue_label() and get_break_label().
-        """
-        con = self.get_new_label()
-        brk = self.get_new_label()
-        self.con_label.append(con)
-        self.brk_label.append(brk)
+        
+        Returns:
+            The (continue, break) labels, so the caller need not fetch them again
+        """
+        con = self.current_label
+        self.current_label = con + 2
+        loops = self.loops
+        i = 2 * self.loop_top
+        if i == len(loops):
+            loops.extend(loops)
+        loops[i] = con
+        loops[i + 1] = con + 1
+        self.loop_top += 1
+        return con, con + 1
 
     def exit_loop(self) -> None:
         """
@@ -238,10 +368,9 @@ class Frame:
         Raises:
             IllegalRuntimeException: When there is an error exiting loop
         """
-        if not self.con_label or not self.brk_label:
+        if not self.loop_top:
             raise IllegalRuntimeException("Error when exit loop")
-        self.con_label.pop()
-        self.brk_label.pop()
+        self.loop_top -= 1
 
     def get_continue_label(self) -> int:
         """
@@ -254,9 +383,9 @@ class Frame:
         Raises:
             IllegalRuntimeException: When there is no continue label
         """
-        if not self.con_label:
+        if not self.loop_top:
             raise IllegalRuntimeException("None continue label")
-        return self.con_label[-1]
+        return self.loops[2 * self.loop_top - 2]
 
     def get_break_label(self) -> int:
         """
@@ -269,7 +398,7 @@ class Frame:
         Raises:
             IllegalRuntimeException: When there is no break label
         """
-        if not self.brk_label:
+        if not self.loop_top:
             raise IllegalRuntimeException("None break label")
-        return self.brk_label[-1]
+        return self.loops[2 * self.loop_top - 1]
 
@@ -1,28 +1,29 @@
 from ..utils.nodes import *
 from .utils import *
+from .emitter import _T_INT, _T_FLOAT, _T_BOOL, _T_STRING, _T_VOID
 
 
 LIB_NAME = "io"
 
 IO_SYMBOL_LIST = [
     # Integer I/O
-    Symbol("readInt", FunctionType([], PrimitiveType("int")), CName(LIB_NAME)),
-    Symbol("writeInt", FunctionType([PrimitiveType("int")], PrimitiveType("void")), CName(LIB_NAME)),
-    Symbol("writeIntLn", FunctionType([PrimitiveType("int")], PrimitiveType("void")), CName(LIB_NAME)),
+    Symbol("readInt", FunctionType([], _T_INT), CName(LIB_NAME)),
+    Symbol("writeInt", FunctionType([_T_INT], _T_VOID), CName(LIB_NAME)),
+    Symbol("writeIntLn", FunctionType([_T_INT], _T_VOID), CName(LIB_NAME)),
     
     # Float I/O
-    Symbol("readFloat", FunctionType([], PrimitiveType("float")), CName(LIB_NAME)),
-    Symbol("writeFloat", FunctionType([PrimitiveType("float")], PrimitiveType("void")), CName(LIB_NAME)),
-    Symbol("writeFloatLn", FunctionType([PrimitiveType("float")], PrimitiveType("void")), CName(LIB_NAME)),
+    Symbol("readFloat", FunctionType([], _T_FLOAT), CName(LIB_NAME)),
+    Symbol("writeFloat", FunctionType([_T_FLOAT], _T_VOID), CName(LIB_NAME)),
+    Symbol("writeFloatLn", FunctionType([_T_FLOAT], _T_VOID), CName(LIB_NAME)),
     
     # Boolean I/O
-    Symbol("readBool", FunctionType([], PrimitiveType("boolean")), CName(LIB_NAME)),
-    Symbol("writeBool", FunctionType([PrimitiveType("boolean")], PrimitiveType("void")), CName(LIB_NAME)),
-    Symbol("writeBoolLn", FunctionType([PrimitiveType("boolean")], PrimitiveType("void")), CName(LIB_NAME)),
+    Symbol("readBool", FunctionType([], _T_BOOL), CName(LIB_NAME)),
+    Symbol("writeBool", FunctionType([_T_BOOL], _T_VOID), CName(LIB_NAME)),
+    Symbol("writeBoolLn", FunctionType([_T_BOOL], _T_VOID), CName(LIB_NAME)),
     
     # String I/O
-    Symbol("readStr", FunctionType([], PrimitiveType("string")), CName(LIB_NAME)),
-    Symbol("writeStr", FunctionType([PrimitiveType("string")], PrimitiveType("void")), CName(LIB_NAME)),
-    Symbol("writeStrLn", FunctionType([PrimitiveType("string")], PrimitiveType("void")), CName(LIB_NAME)),
+    Symbol("readStr", FunctionType([], _T_STRING), CName(LIB_NAME)),
+    Symbol("writeStr", FunctionType([_T_STRING], _T_VOID), CName(LIB_NAME)),
+    Symbol("writeStrLn", FunctionType([_T_STRING], _T_VOID), CName(LIB_NAME)),
 ]
 
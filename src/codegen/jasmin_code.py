@@ -131,6 +131,11 @@ class MachineCode(ABC):
     def emitISUB(self):
         pass
 
+    @abstractmethod
+    def emitIINC(self, in_, i):
+        # in_: Int, i: Int
+        pass
+
     @abstractmethod
     def emitFSUB(self):
         pass
@@ -537,6 +542,10 @@ class JasminCode(MachineCode):
     def emitISUB(self):
         return JasminCode.INDENT + "isub" + JasminCode.END
 
+    def emitIINC(self, in_, i):
+        # in_: Int, i: Int
+        return JasminCode.INDENT + "iinc " + str(in_) + " " + str(i) + JasminCode.END
+
     def emitFSUB(self):
         return JasminCode.INDENT + "fsub" + JasminCode.END
 
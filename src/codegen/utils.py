@@ -1,4 +1,6 @@
-from ..utils.nodes import Type
+from collections import ChainMap
+from dataclasses import dataclass, field
+from ..utils.nodes import Type, ClassType  # one ClassType for AST-declared and generated types
 from .frame import Frame
 
 
@@ -14,43 +16,43 @@ class FunctionType(Type):
         return visitor.visit_function_type(self, o)
 
 
-class ClassType(Type):
-    """Class type node."""
-
-    def __init__(self, class_name):
-        super().__init__()
-        self.class_name = class_name
-
-    def accept(self, visitor, o=None):
-        return visitor.visit_class_type(self, o)
-
-
 class Value:
-    pass
+    __slots__ = ()
 
 
+@dataclass(frozen=True, slots=True)
 class Index(Value):
-    def __init__(self, value: int):
-        self.value = value
+    value: int
 
 
+@dataclass(frozen=True, slots=True)
 class CName(Value):
-    def __init__(self, value: str):
-        self.value = value
+    value: str
 
 
+@dataclass(frozen=True, slots=True)
 class Symbol:
-    def __init__(self, name: str, _type: Type, value: Value):
-        self.name = name
-        self.type = _type
-        self.value = value
+    name: str
+    type: Type
+    value: Value
+    # True for local-variable slots (Index), False for class/library names (CName)
+    is_local: bool = field(init=False)
+    # Load/store instructions of a local slot, prebuilt by the code generator;
+    # None when they were not (or cannot be) prebuilt
+    read_code: str = None
+    write_code: str = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "is_local", isinstance(self.value, Index))
 
 
 class Access:
+    __slots__ = ("frame", "sym", "is_left", "is_first")
+
     def __init__(
         self,
         frame: Frame,
-        sym: list["Symbol"],
+        sym: dict[str, "Symbol"],
         is_left: bool = False,
         is_first: bool = False,
     ):
@@ -59,9 +61,32 @@ class Access:
         self.is_left = is_left
         self.is_first = is_first
 
+    def reset(self, is_left: bool = False, is_first: bool = False) -> "Access":
+        self.is_left = is_left
+        self.is_first = is_first
+        return self
+
 
 class SubBody:
-    def __init__(self, frame: Frame, sym: list["Symbol"]):
+    __slots__ = ("frame", "sym", "access", "from_label", "to_label")
+
+    def __init__(
+        self,
+        frame: Frame,
+        sym: ChainMap[str, "Symbol"],
+        from_label: int = None,
+        to_label: int = None,
+    ):
         self.frame = frame
         self.sym = sym
-
+        self.access = None
+        # Labels bounding the method scope, used by the .var directives of locals
+        self.from_label = from_label
+        self.to_label = to_label
+
+    def read_access(self) -> Access:
+        # One Access per scope, reset for each statement's expressions;
+        # created on first use
+        if self.access is None:
+            self.access = Access(self.frame, self.sym)
+        return self.access.reset()
@@ -65,12 +65,13 @@ stmtlist: stmt stmtlist |;
 stmt: vardef | returnstmt | ifstmt | forstmt | continuestmt | breakstmt | reftype | assignstmt | attritype AMP ID SEMI | callexpr SEMI | body;
 
 // definition all possible format of calling method, accessing to attributes,...
-callexpr: ID
-        | (ID | THIS) callmethods              // a.foo().goo(a,b), this.foo();
-        | (ID | THIS) DOT ID callexpr
-        | ID DOT ID ASSIGN expr       // a.length := expr, this.length := expr;
-        | THIS DOT ID ASSIGN expr
-        | (ID | THIS) DOT arrtype;
+callexpr: ID                                        # callId
+        | (ID | THIS) callmethods                   # callMethods         // a.foo().goo(a,b), this.foo();
+        | (ID | THIS) DOT ID callexpr               # callDotChain
+        | ID DOT ID ASSIGN expr                     # callIdFieldAssign   // a.length := expr, this.length := expr;
+        | THIS DOT ID ASSIGN expr                   # callThisFieldAssign
+        | (ID | THIS) DOT arrtype                   # callDotArrtype
+        ;
 
 // attribute declaration outside method, inside a class
 attridecl: staticfinal attritype attrilist SEMI;
@@ -96,13 +97,14 @@ returnstmt: RETURN (expr | ) SEMI;
 // nhưng do có xuất hiện trường hợp a.foo() := ...
 // nghĩa là không được gán sau khi gọi hàm nên mới viết rule riêng cho lhs :))
 assignstmt: lhs ASSIGN expr SEMI;
-lhs: ID
-    | (ID | THIS) DOT arrayaccess
-    | ID DOT ID
-    | (ID | THIS) DOT lhs
-    | arrayaccess
-    | (ID | THIS) callmethods DOT lhs
-    | LBRACE exprlist RBRACE DOT lhs;
+lhs: ID                                             # lhsId
+    | (ID | THIS) DOT arrayaccess                   # lhsDotArrAcc
+    | ID DOT ID                                     # lhsIdDotId
+    | (ID | THIS) DOT lhs                           # lhsDotLhs
+    | arrayaccess                                   # lhsArrAcc
+    | (ID | THIS) callmethods DOT lhs               # lhsCallDotLhs
+    | LBRACE exprlist RBRACE DOT lhs                # lhsArrLitDotLhs
+    ;
 
 // if statment
 // ifstmt: IF (expr | LB expr RB) THEN (stmt | LBRACE stmtlist RBRACE | continuestmt | breakstmt)  elselist;
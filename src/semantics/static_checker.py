@@ -10,8 +10,8 @@ specified in the OPLang language specification.
 # File đang làm nè nha
 # 31 thg 10, 2025
 
-from functools import reduce
-from typing import Dict, List, Set, Optional, Any, Tuple, Union, NamedTuple
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Set, Optional, Any, Tuple, Union, NamedTuple
 from ..utils.visitor import ASTVisitor
 from ..utils.nodes import (
     ASTNode, Program, ClassDecl, AttributeDecl, Attribute, MethodDecl,
@@ -36,6 +36,8 @@ from .static_error import (
 # Final
 # MSSV: 2313452
 class FunctionType(Type):
+    __slots__ = ("param_types", "return_type")
+
     def __init__(self, param_types: List[Type], return_type: Type):
         super().__init__()
         self.param_types = param_types
@@ -45,7 +47,73 @@ class FunctionType(Type):
         return visitor.visit_function_type(self, o)
 
 
+# Kiểu nguyên thủy dùng chung: node kiểu không bị sửa sau khi tạo
+_PRIM = {name: PrimitiveType(name)
+         for name in ("int", "float", "boolean", "string", "void", "unknown", "nil")}
+_INT = _PRIM["int"]
+_FLOAT = _PRIM["float"]
+_BOOL = _PRIM["boolean"]
+_STR = _PRIM["string"]
+_VOID = _PRIM["void"]
+
+# Giá trị PrimitiveType._code
+_CODE_INT, _CODE_FLOAT, _CODE_BOOL, _CODE_STR, _CODE_OTHER = range(5)
+
+# API của thư viện 'io': tên -> (kiểu tham số, kiểu trả về)
+_IO_API = {
+    "readInt": ((), _INT),
+    "writeInt": ((_INT,), _VOID),
+    "writeIntLn": ((_INT,), _VOID),
+    "readFloat": ((), _FLOAT),
+    "writeFloat": ((_FLOAT,), _VOID),
+    "writeFloatLn": ((_FLOAT,), _VOID),
+    "readBool": ((), _BOOL),
+    "writeBool": ((_BOOL,), _VOID),
+    "writeBoolLn": ((_BOOL,), _VOID),
+    "readStr": ((), _STR),
+    "writeStr": ((_STR,), _VOID),
+    "writeStrLn": ((_STR,), _VOID),
+}
+
+
+def _is_prim(typ: Type, name: str) -> bool:
+    # So sánh định danh trước; kiểu lấy từ AST là object riêng nên so tên
+    return typ is _PRIM[name] or (isinstance(typ, PrimitiveType) and typ.type_name == name)
+
+
+def _type_key(typ: Type):
+    # Khóa cấu trúc của một kiểu, dùng cho cache tương thích kiểu
+    if isinstance(typ, ReferenceType):
+        return _type_key(typ.referenced_type)
+    if isinstance(typ, PrimitiveType):
+        return typ.type_name
+    if isinstance(typ, ClassType):
+        return ("class", typ.class_name)
+    if isinstance(typ, ArrayType):
+        return ("array", _type_key(typ.element_type), typ.size)
+    return type(typ)
+
+
+def _sig(typ: Type) -> str:
+    # Chuỗi chữ ký của kiểu tham số: "int", "C:Foo", "A:3:int", "A:10:C:Bar"
+    if isinstance(typ, PrimitiveType):
+        return typ.type_name
+    if isinstance(typ, ClassType):
+        return "C:" + typ.class_name
+    if isinstance(typ, ArrayType):
+        return "A:%d:%s" % (typ.size, _sig(typ.element_type))
+    if isinstance(typ, ReferenceType):
+        return "R:" + _sig(typ.referenced_type)
+    return type(typ).__name__
+
+
+def _method_sig(params: List[Parameter]) -> str:
+    return ",".join(_sig(p.param_type) for p in params)
+
+
 class Symbol:
+    __slots__ = ("name", "typ", "isfinal", "isStatic")
+
     def __init__(self, name: str, typ: 'Type', isFinal: 'bool' = False, isStatic: 'bool' = False):
         self.name = name
         self.typ = typ
@@ -53,13 +121,110 @@ class Symbol:
         self.isStatic = isStatic
 
 
+# Symbol kết quả dùng chung cho biểu thức có kiểu nguyên thủy; Symbol không bị sửa sau khi tạo
+_SYM_INT = Symbol("", _INT)
+_SYM_FLOAT = Symbol("", _FLOAT)
+_SYM_BOOL = Symbol("", _BOOL)
+_SYM_STR = Symbol("", _STR)
+_SYM_NIL = Symbol("", _PRIM["nil"])
+_SYM_EMPTY_ARRAY = Symbol("", ArrayType(_PRIM["unknown"], 0))
+
+
+@dataclass
+class ClassIndex:
+    # Bảng tra thành viên của một lớp (gồm cả thành viên kế thừa), dựng một lần từ ClassDecl
+    attrs: Dict[str, Symbol] = field(default_factory=dict)
+    methods: Dict[str, List[MethodDecl]] = field(default_factory=dict)
+    # Symbol (kiểu FunctionType) của overload được chọn khi gọi method theo tên
+    method_symbols: Dict[str, Symbol] = field(default_factory=dict)
+    has_main: bool = False
+    # (tên, chữ ký) của các method đã duyệt, để phát hiện overload trùng
+    method_sigs: Set[Tuple[str, str]] = field(default_factory=set)
+
+    @classmethod
+    def from_decl(cls, node: ClassDecl, parent: Optional["ClassIndex"] = None) -> "ClassIndex":
+        index = cls()
+        for member in node.members:
+            if isinstance(member, AttributeDecl):
+                for attr in member.attributes:
+                    # Giữ khai báo đầu tiên, giống thứ tự duyệt members trước đây
+                    if attr.name not in index.attrs:
+                        index.attrs[attr.name] = Symbol(attr.name, member.attr_type, member.is_final,
+                                                        member.is_static)
+            elif isinstance(member, MethodDecl):
+                index.methods.setdefault(member.name, []).append(member)
+                if member.is_static and not member.params and _is_prim(member.return_type, "void"):
+                    index.has_main = True
+        for name, overloads in index.methods.items():
+            method = overloads[0]
+            method_type = FunctionType([p.param_type for p in method.params], method.return_type)
+            index.method_symbols[name] = Symbol(name, method_type, isStatic=method.is_static)
+        if parent is not None:
+            # Thành viên của lớp con che thành viên cùng tên của lớp cha
+            for name, sym in parent.attrs.items():
+                index.attrs.setdefault(name, sym)
+            for name, overloads in parent.methods.items():
+                if name not in index.methods:
+                    index.methods[name] = overloads
+                    index.method_symbols[name] = parent.method_symbols[name]
+        return index
+
+
 class StaticChecker(ASTVisitor):
     def __init__(self):
         self.list_class: List[ClassDecl] = []
+        self.class_by_name: Dict[str, ClassDecl] = {}
+        self._class_index: Dict[str, ClassIndex] = {}
+        # Symbol của các tên đã tra khi kiểm tra biểu thức hằng, dùng một lần
+        self._const_syms: Dict[int, Symbol] = {}
         self.loop = 0
         self.current_return_type: Optional[Type] = None
-        self.in_static_method = False
+        # MethodDecl đang được kiểm tra (None khi ở ngoài phương thức)
+        self.current_method: Optional[MethodDecl] = None
         self.current_class: Optional[ClassDecl] = None
+        self._compat_cache: Dict[Tuple[Any, Any], bool] = {}
+        self._ancestor_cache: Dict[str, FrozenSet[str]] = {}
+        self._class_types: Dict[str, ClassType] = {}
+        # Bảng dispatch theo type(node) thay cho chuỗi isinstance
+        self._compat_handlers = {
+            PrimitiveType: self._compat_primitive,
+            ArrayType: self._compat_array,
+            ClassType: self._compat_class,
+        }
+        self._const_expr_handlers = {
+            IntLiteral: self._const_literal,
+            FloatLiteral: self._const_literal,
+            BoolLiteral: self._const_literal,
+            StringLiteral: self._const_literal,
+            ArrayLiteral: self._const_array_literal,
+            ObjectCreation: self._const_object_creation,
+            ParenthesizedExpression: self._const_parenthesized,
+            BinaryOp: self._const_binary_op,
+            UnaryOp: self._const_unary_op,
+            Identifier: self._const_name,
+            PostfixExpression: self._const_name,
+        }
+        self._postfix_handlers = {
+            ArrayAccess: self._postfix_array_access,
+            MemberAccess: self._postfix_member_access,
+            MethodCall: self._postfix_method_call,
+        }
+        self._binop_handlers = {
+            "+": self._binop_arith,
+            "-": self._binop_arith,
+            "*": self._binop_arith,
+            "/": self._binop_arith,
+            "%": self._binop_mod,
+            "^": self._binop_concat,
+            "==": self._binop_equality,
+            "!=": self._binop_equality,
+            "<": self._binop_ordering,
+            ">": self._binop_ordering,
+            "<=": self._binop_ordering,
+            ">=": self._binop_ordering,
+            "&&": self._binop_logical,
+            "||": self._binop_logical,
+        }
 
     def check_program(self, ast):
         self.visit(ast)
@@ -68,47 +233,46 @@ class StaticChecker(ASTVisitor):
         # self.list_class += node.class_decls
         # Không cộng dồn để khai báo tuần tự
         self.list_class = []
-        reduce(lambda acc, class_decl: [self.visit(class_decl, acc)] + acc[1:], node.class_decls,
-               [[Symbol("io", ClassType("io"))]])
-
-        main_found = False
-        for cls in self.list_class:
-            # self.list_class: List[ClassDecl] = []
-            for member in cls.members:
-                if isinstance(member, MethodDecl):
-                    is_static = member.is_static
-                    has_no_params = len(member.params) == 0
-                    returns_void = (isinstance(member.return_type,
-                                               PrimitiveType) and member.return_type.type_name == "void")
-
-                    if is_static and has_no_params and returns_void:
-                        main_found = True
-                        break
-
-            if main_found:
-                break
-
-        if not main_found:
+        self.class_by_name = {}
+        self._class_index = {}
+        self._compat_cache = {}
+        self._ancestor_cache = {}
+        self._class_types = {}
+        # Trạng thái duyệt có thể còn sót lại nếu lần kiểm tra trước dừng giữa chừng vì lỗi
+        self._const_syms = {}
+        self.loop = 0
+        self.current_return_type = None
+        self.current_method = None
+        self.current_class = None
+        env = [{"io": Symbol("io", self._class_type("io"))}]
+        for class_decl in node.class_decls:
+            env[0] = self.visit(class_decl, env)
+
+        # Entry point: method static, không tham số, trả về void (ghi nhận khi dựng ClassIndex)
+        if not any(self._class_index[cls.name].has_main for cls in self.list_class):
             raise NoEntryPoint()
 
-    def visit_class_decl(self, node: "ClassDecl", o: list[list[Symbol]] = None) -> list[Symbol]:
-        found = next(filter(lambda sym: sym.name == node.name, o[0]), None)
-        if found:
+    def visit_class_decl(self, node: "ClassDecl", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
+        if node.name in o[0]:
             raise Redeclared("Class", node.name)
 
         # Kiểm tra Undeclared S_are_types_compatibleuperclass
         if node.superclass:
-            parent_found = next(filter(lambda sym: sym.name == node.superclass, o[0]), None)
-            if not parent_found:
+            if node.superclass not in o[0]:
                 raise UndeclaredClass(node.superclass)
         self.list_class.append(node)
+        self.class_by_name[node.name] = node
+        self._class_index[node.name] = ClassIndex.from_decl(node, self._class_index.get(node.superclass))
         self.current_class = node
-        # Dùng reduce để duyệt qua các thành viên, truyền vào môi trường mới
-        reduce(lambda acc, member: [self.visit(member, acc)] + acc[1:], node.members, [[]] + o)
+        # Duyệt qua các thành viên, cập nhật scope của lớp tại chỗ
+        env = [{}] + o
+        for member in node.members:
+            env[0] = self.visit(member, env)
 
         self.current_class = None
         # Trả về global scope đã được cập nhật với class mới
-        return [Symbol(node.name, ClassType(node.name))] + o[0]
+        o[0][node.name] = Symbol(node.name, self._class_type(node.name))
+        return o[0]
 
     # HELPING FUNCTIONS
     # Thêm phương thức private này vào class StaticChecker
@@ -134,8 +298,65 @@ class StaticChecker(ASTVisitor):
     #     elif isinstance(expr, UnaryOp):
     #         self._check_is_constant_expr(expr.operand)
     #
+    @staticmethod
+    def _lookup(name: str, o: list[dict[str, Symbol]]) -> Optional[Symbol]:
+        # Tìm từ scope trong cùng ra ngoài, dừng ngay khi thấy
+        for scope in o:
+            sym = scope.get(name)
+            if sym is not None:
+                return sym
+        return None
+
     # CHECK TYPE COMPATIBALE
     def _are_types_compatible(self, lhs_type: Type, rhs_type: Type) -> bool:
+        # Đường tắt cho trường hợp phổ biến nhất: hai kiểu nguyên thủy
+        if lhs_type.__class__ is PrimitiveType and rhs_type.__class__ is PrimitiveType:
+            if lhs_type is rhs_type:
+                return True
+            lhs_name = lhs_type.type_name
+            rhs_name = rhs_type.type_name
+            return lhs_name == rhs_name or (lhs_name == "float" and rhs_name == "int")
+        # Cùng một ClassType (kiểu khai báo được intern theo tên): luôn tương thích
+        if lhs_type is rhs_type and lhs_type.__class__ is ClassType:
+            return True
+        key = (_type_key(lhs_type), _type_key(rhs_type))
+        cached = self._compat_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._compute_types_compatible(lhs_type, rhs_type)
+        # Chuỗi kế thừa chưa khai báo đủ thì kết quả có thể đổi, không cache
+        rhs_key = key[1]
+        if not (isinstance(rhs_key, tuple) and rhs_key[0] == "class"
+                and rhs_key[1] not in self._ancestor_cache):
+            self._compat_cache[key] = result
+        return result
+
+    def _ancestors(self, class_name: str) -> FrozenSet[str]:
+        # Tập tên lớp gồm class_name và mọi lớp cha của nó
+        cached = self._ancestor_cache.get(class_name)
+        if cached is not None:
+            return cached
+        names = set()
+        current_class_name = class_name
+        while current_class_name:
+            names.add(current_class_name)
+            parent_decl = self.class_by_name.get(current_class_name)
+            if parent_decl is None:
+                # Lớp chưa được khai báo: chuỗi chưa đầy đủ
+                return names
+            current_class_name = parent_decl.superclass
+        names = frozenset(names)
+        self._ancestor_cache[class_name] = names
+        return names
+
+    def _class_type(self, name: str) -> ClassType:
+        # Một ClassType dùng chung cho mỗi tên lớp trong chương trình đang kiểm tra
+        typ = self._class_types.get(name)
+        if typ is None:
+            typ = self._class_types[name] = ClassType(name)
+        return typ
+
+    def _compute_types_compatible(self, lhs_type: Type, rhs_type: Type) -> bool:
         # Lấy ra kiểu dữ liệu thực sự để so sánh
         comp_lhs_type = lhs_type.referenced_type if isinstance(lhs_type, ReferenceType) else lhs_type
         comp_rhs_type = rhs_type.referenced_type if isinstance(rhs_type, ReferenceType) else rhs_type
@@ -150,121 +371,101 @@ class StaticChecker(ASTVisitor):
             return False
 
         # 3. So sánh chi tiết cho từng loại
-        if isinstance(comp_lhs_type, PrimitiveType):
-            is_type_compatible = comp_lhs_type.type_name == comp_rhs_type.type_name
-            return is_type_compatible
-
-        if isinstance(comp_lhs_type, ArrayType):
-            if comp_lhs_type.size != comp_rhs_type.size:
-                return False
-            if isinstance(comp_rhs_type.element_type,
-                          PrimitiveType) and comp_rhs_type.element_type.type_name == "unknown":
-                return True
-            # Quy tắc nghiêm ngặt cho mảng: kiểu phần tử phải giống hệt
-            elem_lhs = comp_lhs_type.element_type
-            elem_rhs = comp_rhs_type.element_type
-            if type(elem_lhs) is not type(elem_rhs): return False
-            if isinstance(elem_lhs, PrimitiveType): return elem_lhs.type_name == elem_rhs.type_name
-            if isinstance(elem_lhs, ClassType): return elem_lhs.class_name == elem_rhs.class_name
-            return False
+        handler = self._compat_handlers.get(type(comp_lhs_type))
+        return handler(comp_lhs_type, comp_rhs_type) if handler else False
 
-        if isinstance(comp_lhs_type, ClassType):
-            # Xử lý kế thừa
-            current_class_name = comp_rhs_type.class_name
-            while current_class_name:
-                if current_class_name == comp_lhs_type.class_name:
-                    return True
-                parent_decl = next((cls for cls in self.list_class if cls.name == current_class_name), None)
-                current_class_name = parent_decl.superclass if parent_decl else None
-            return False
+    def _compat_primitive(self, lhs: PrimitiveType, rhs: PrimitiveType) -> bool:
+        return lhs.type_name == rhs.type_name
 
+    def _compat_array(self, lhs: ArrayType, rhs: ArrayType) -> bool:
+        if lhs.size != rhs.size:
+            return False
+        if isinstance(rhs.element_type, PrimitiveType) and rhs.element_type.type_name == "unknown":
+            return True
+        # Quy tắc nghiêm ngặt cho mảng: kiểu phần tử phải giống hệt
+        elem_lhs = lhs.element_type
+        elem_rhs = rhs.element_type
+        if type(elem_lhs) is not type(elem_rhs): return False
+        if isinstance(elem_lhs, PrimitiveType): return elem_lhs.type_name == elem_rhs.type_name
+        if isinstance(elem_lhs, ClassType): return elem_lhs.class_name == elem_rhs.class_name
         return False
 
-    def _check_is_constant_expr(self, expr, o=None):
-        # Hàm nội bộ để kiểm tra đệ quy và bắt lỗi từ con đẩy lên cha
-        def recursive_check(child_expr):
-            try:
-                self._check_is_constant_expr(child_expr, o)
-            except IllegalConstantExpression:
-                # Nếu con lỗi, ném lỗi tại node cha hiện tại (expr)
-                # Đây là fix cho test_082 và test_084
-                raise IllegalConstantExpression(expr)
+    def _compat_class(self, lhs: ClassType, rhs: ClassType) -> bool:
+        # Xử lý kế thừa
+        return lhs.class_name in self._ancestors(rhs.class_name)
 
-        if expr is None or isinstance(expr, NilLiteral):
+    def _check_is_constant_expr(self, expr, o=None):
+        if expr is None:
             # Nil không được làm hằng số
-            raise IllegalConstantExpression(expr if expr else NilLiteral())
-
-        # 1. Các literal luôn đúng
-        if isinstance(expr, (IntLiteral, FloatLiteral, BoolLiteral, StringLiteral)):
-            return
-
-        # 2. Mảng và Object: Kiểm tra đệ quy các phần tử
-        if isinstance(expr, ArrayLiteral):
-            for element in expr.value:
-                # Lưu ý: ArrayLiteral lỗi tại chính nó nếu phần tử con lỗi
-                self._check_is_constant_expr(element, o)
-            return
-
-        if isinstance(expr, ObjectCreation):
-            for arg in expr.args:
-                # ObjectCreation lỗi tại chính nó nếu tham số lỗi
-                self._check_is_constant_expr(arg, o)
-            return
-
-        # 3. Biểu thức ngoặc: Kiểm tra bên trong
-        if isinstance(expr, ParenthesizedExpression):
-            recursive_check(expr.expr)
-            return
-
-        # 4. Phép toán hai ngôi: Kiểm tra trái phải
-        if isinstance(expr, BinaryOp):
-            recursive_check(expr.left)
-            recursive_check(expr.right)
-            return
-
-        # 5. Phép toán một ngôi: Kiểm tra toán hạng
-        if isinstance(expr, UnaryOp):
-            recursive_check(expr.operand)
-            return
-
-        # 6. Identifier và Postfix (Truy cập thành viên): Fix cho test_086
-        # Chỉ hợp lệ nếu có scope (o) và biến đó là final
-        if isinstance(expr, (Identifier, PostfixExpression)):
-            if o is None:
-                raise IllegalConstantExpression(expr)
+            raise IllegalConstantExpression(NilLiteral())
+        handler = self._const_expr_handlers.get(type(expr))
+        if handler is None:
+            # Nil, lời gọi hàm, this, ... không phải biểu thức hằng
+            raise IllegalConstantExpression(expr)
+        handler(expr, o)
+
+    def _check_const_child(self, parent, child, o):
+        # Kiểm tra đệ quy và bắt lỗi từ con đẩy lên cha
+        try:
+            self._check_is_constant_expr(child, o)
+        except IllegalConstantExpression:
+            # Nếu con lỗi, ném lỗi tại node cha hiện tại
+            # Đây là fix cho test_082 và test_084
+            raise IllegalConstantExpression(parent)
+
+    def _const_literal(self, expr, o):
+        # Các literal luôn đúng
+        pass
 
-            # Kiểm tra xem định danh này có phải là hằng số (final) không
-            try:
-                # Gọi visit để lấy Symbol
-                sym = self.visit(expr, o)
-                # Nếu visit trả về Type (trường hợp class access), lấy thuộc tính typ nếu cần
-                # Nhưng thường Identifier/Postfix trả về Symbol hoặc Type.
-
-                is_final = False
-                if isinstance(sym, Symbol):
-                    is_final = sym.isfinal
-                # Nếu logic của bạn trả về Type cho Enum/Constant đặc biệt, cần handle ở đây
-                # Nhưng theo Symbol class của bạn thì check sym.isfinal là chuẩn.
-
-                if not is_final:
-                    raise IllegalConstantExpression(expr)
-            except IllegalConstantExpression:
-                raise
-            except Exception:
-                # Bất kỳ lỗi nào khác (Undeclared, TypeMismatch...)
-                # khi đang check hằng số đều coi là biểu thức hằng không hợp lệ
-                raise IllegalConstantExpression(expr)
-            return
+    def _const_array_literal(self, expr: ArrayLiteral, o):
+        for element in expr.value:
+            # Lưu ý: ArrayLiteral lỗi tại chính nó nếu phần tử con lỗi
+            self._check_is_constant_expr(element, o)
+
+    def _const_object_creation(self, expr: ObjectCreation, o):
+        for arg in expr.args:
+            # ObjectCreation lỗi tại chính nó nếu tham số lỗi
+            self._check_is_constant_expr(arg, o)
+
+    def _const_parenthesized(self, expr: ParenthesizedExpression, o):
+        self._check_const_child(expr, expr.expr, o)
 
-        # Các trường hợp khác (Call, v.v.)
-        raise IllegalConstantExpression(expr)
+    def _const_binary_op(self, expr: BinaryOp, o):
+        self._check_const_child(expr, expr.left, o)
+        self._check_const_child(expr, expr.right, o)
+
+    def _const_unary_op(self, expr: UnaryOp, o):
+        self._check_const_child(expr, expr.operand, o)
+
+    def _const_name(self, expr, o):
+        # Identifier và Postfix (Truy cập thành viên): Fix cho test_086
+        # Chỉ hợp lệ nếu có scope (o) và biến đó là final
+        if o is None:
+            raise IllegalConstantExpression(expr)
 
-    def visit_attribute_decl(self, node: "AttributeDecl", o: list[list[Symbol]] = None) -> list[Symbol]:
+        # Kiểm tra xem định danh này có phải là hằng số (final) không
+        try:
+            # Gọi visit để lấy Symbol
+            sym = self.visit(expr, o)
+            is_final = isinstance(sym, Symbol) and sym.isfinal
+            if not is_final:
+                raise IllegalConstantExpression(expr)
+            # Lưu lại để lần visit kiểu ngay sau đó không phải tra lại
+            self._const_syms[id(expr)] = sym
+        except IllegalConstantExpression:
+            raise
+        except Exception:
+            # Bất kỳ lỗi nào khác (Undeclared, TypeMismatch...)
+            # khi đang check hằng số đều coi là biểu thức hằng không hợp lệ
+            raise IllegalConstantExpression(expr)
+
+    def visit_attribute_decl(self, node: "AttributeDecl", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         current_scope = o[0]
+        # Các thuộc tính mới chỉ vào scope sau khi duyệt hết khai báo
+        new_syms = {}
         for attr in node.attributes:
             kind = "Constant" if node.is_final else "Attribute"
-            found = next(filter(lambda sym: sym.name == attr.name, current_scope), None)
-            if found:
+            if attr.name in current_scope or attr.name in new_syms:
                 raise Redeclared(kind, attr.name)
 
             # Logic for checking valid constant expression
@@ -273,131 +474,96 @@ class StaticChecker(ASTVisitor):
 
             if attr.init_value:
                 init_sym = self.visit(attr.init_value, o)
+                self._const_syms.clear()
                 if node.is_final and not self._are_types_compatible(node.attr_type, init_sym.typ):
                     raise TypeMismatchInConstant(node)
 
-            new_symbol = Symbol(attr.name, node.attr_type, node.is_final, node.is_static)
-            current_scope = [new_symbol] + current_scope
+            new_syms[attr.name] = Symbol(attr.name, node.attr_type, node.is_final, node.is_static)
 
+        current_scope.update(new_syms)
         return current_scope
 
     # kind: Variable, Constant, Attribute, Class, Method, Parameter
-    def visit_attribute(self, node: "Attribute", o: list[list[Symbol]] = None) -> list[Symbol]:
+    def visit_attribute(self, node: "Attribute", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         pass
 
-    def visit_method_decl(self, node: "MethodDecl", o: list[list[Symbol]] = None) -> list[Symbol]:
+    def visit_method_decl(self, node: "MethodDecl", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         current_scope = o[0]
 
         # --- FIX: Support Method Overloading (Test 121) ---
-        # 1. Tìm tất cả các symbol có cùng tên trong scope hiện tại
-        entries = [sym for sym in current_scope if sym.name == node.name]
-
-        # 2. Lấy danh sách kiểu tham số của method đang khai báo
-        new_param_types = [p.param_type for p in node.params]
-
-        for entry in entries:
-            # Nếu trùng tên với Attribute/Constant -> Vẫn là Redeclared (không overload được với field)
-            if not isinstance(entry.typ, FunctionType):
-                raise Redeclared("Method", node.name)
-
-            # Nếu là Method, kiểm tra signature (danh sách kiểu tham số)
-            existing_param_types = entry.typ.param_types
-
-            # Nếu số lượng tham số khác nhau -> OK (Overload hợp lệ) -> Bỏ qua check tiếp
-            if len(existing_param_types) != len(new_param_types):
-                continue
-
-            # Nếu cùng số lượng, kiểm tra kiểu từng tham số (Strict Match)
-            # Hai method trùng nhau khi và chỉ khi TẤT CẢ kiểu tham số giống hệt nhau
-            is_duplicate_signature = True
-            for t1, t2 in zip(existing_param_types, new_param_types):
-                type_differs = False
-
-                # So sánh loại class Type
-                if type(t1) is not type(t2):
-                    type_differs = True
-                elif isinstance(t1, PrimitiveType) and t1.type_name != t2.type_name:
-                    type_differs = True
-                elif isinstance(t1, ClassType) and t1.class_name != t2.class_name:
-                    type_differs = True
-                elif isinstance(t1, ArrayType):
-                    # So sánh mảng: size và kiểu phần tử
-                    if t1.size != t2.size:
-                        type_differs = True
-                    # Check deep element type (giản lược: check class name/type name)
-                    elif isinstance(t1.element_type,
-                                    PrimitiveType) and t1.element_type.type_name != t2.element_type.type_name:
-                        type_differs = True
-                    elif isinstance(t1.element_type,
-                                    ClassType) and t1.element_type.class_name != t2.element_type.class_name:
-                        type_differs = True
-
-                if type_differs:
-                    is_duplicate_signature = False
-                    break
-
-            # Nếu signature y hệt -> Lỗi Redeclared thực sự
-            if is_duplicate_signature:
-                raise Redeclared("Method", node.name)
+        # 1. Tìm symbol cùng tên trong scope hiện tại
+        entry = current_scope.get(node.name)
+        # Nếu trùng tên với Attribute/Constant -> Vẫn là Redeclared (không overload được với field)
+        if entry is not None and not isinstance(entry.typ, FunctionType):
+            raise Redeclared("Method", node.name)
+
+        # 2. Hai method trùng nhau khi và chỉ khi TẤT CẢ kiểu tham số giống hệt nhau
+        signature = (node.name, _method_sig(node.params))
+        class_sigs = self._class_index[self.current_class.name].method_sigs
+        if signature in class_sigs:
+            raise Redeclared("Method", node.name)
+        class_sigs.add(signature)
         # ----------------------------------------------------
 
         # (Logic cũ: Tạo scope cho param và visit body)
-        param_scope = []
+        param_scope = {}
         for param in node.params:
-            found_param = next(filter(lambda p: p.name == param.name, param_scope), None)
-            if found_param:
+            if param.name in param_scope:
                 raise Redeclared("Parameter", param.name)
-            param_scope += [Symbol(param.name, param.param_type)] + param_scope
+            param_scope[param.name] = Symbol(param.name, param.param_type)
 
         # Check conflicts between params and var in body
         if isinstance(node.body, BlockStatement):
             for decl in node.body.var_decls:
                 for var in decl.variables:
-                    if any(p.name == var.name for p in param_scope):
+                    if var.name in param_scope:
                         kind = "Constant" if decl.is_final else "Variable"
                         raise Redeclared(kind, var.name)
 
-        # Logic quản lý static method
-        old_in_static = self.in_static_method
-        self.in_static_method = node.is_static
+        # Logic quản lý static method: đọc trực tiếp node.is_static
+        old_method = self.current_method
+        self.current_method = node
 
         try:
             self.current_return_type = node.return_type
             self.visit(node.body, [param_scope] + o[1:])
         finally:
             self.current_return_type = None
-            self.in_static_method = old_in_static
+            self.current_method = old_method
 
         method_type = FunctionType([p.param_type for p in node.params], node.return_type)
 
         # Cộng dồn symbol vào scope hiện tại
-        return [Symbol(node.name, method_type, isStatic=node.is_static)] + current_scope
+        current_scope[node.name] = Symbol(node.name, method_type, isStatic=node.is_static)
+        return current_scope
 
-    def visit_constructor_decl(self, node: "ConstructorDecl", o: list[list[Symbol]] = None) -> list[Symbol]:
+    def visit_constructor_decl(self, node: "ConstructorDecl", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         current_scope = o[0]
 
-        param_scope = []
+        param_scope = {}
 
         for param in node.params:
-            found_param = next(filter(lambda sym: sym.name == param.name, param_scope), None)
-            if found_param:
+            if param.name in param_scope:
                 raise Redeclared("Parameter", param.name)
 
-            param_scope += [Symbol(param.name, param.param_type)]
+            param_scope[param.name] = Symbol(param.name, param.param_type)
 
             # Visit thân hàm với môi trường mới
         self.visit(node.body, [param_scope] + o)
         return current_scope
 
-    def visit_destructor_decl(self, node: "DestructorDecl", o: list[list[Symbol]] = None) -> list[Symbol]:
+    def visit_destructor_decl(self, node: "DestructorDecl", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         self.visit(node.body, o)
         return o[0]
 
-    def visit_parameter(self, node: "Parameter", o: list[list[Symbol]] = None) -> list[Symbol]:
-        return [Symbol(node.name, node.param_type)] + o[0]
+    def visit_parameter(self, node: "Parameter", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
+        o[0][node.name] = Symbol(node.name, node.param_type)
+        return o[0]
 
-    def visit_block_statement(self, node: "BlockStatement", o: list[list[Symbol]] = None) -> list[Symbol]:
-        local_scope = reduce(lambda acc, decl: self.visit(decl, [acc] + o), node.var_decls, [])
+    def visit_block_statement(self, node: "BlockStatement", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
+        new_env = [{}] + o
+        for decl in node.var_decls:
+            new_env[0] = self.visit(decl, new_env)
         """
         Khi muốn tạo một môi trường env mới để 
         visit xuống sâu hơn, quy tắc gần như luôn luôn là:
@@ -405,22 +571,21 @@ class StaticChecker(ASTVisitor):
         new_env = [scope_mới] + scope_cũ
         """
 
-        # Môi trường mới để duyệt các statements: [local_scope, param_scope, class_scope, ...]
-        new_env = [local_scope] + o
-
-        # Duyệt qua các statements
-        list(map(lambda stmt: self.visit(stmt, new_env), node.statements))
+        # Duyệt qua các statements với môi trường [local_scope, param_scope, class_scope, ...]
+        for stmt in node.statements:
+            self.visit(stmt, new_env)
 
         return o[0]
 
-    def visit_variable_decl(self, node: "VariableDecl", o: list[list[Symbol]] = None) -> list[Symbol]:
+    def visit_variable_decl(self, node: "VariableDecl", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         current_scope = o[0]
+        # Các biến mới chỉ vào scope sau khi duyệt hết khai báo
+        new_syms = {}
 
         for var in node.variables:
             kind = "Constant" if node.is_final else "Variable"
 
-            found_in_local = next(filter(lambda sym: sym.name == var.name, current_scope), None)
-            if found_in_local:
+            if var.name in current_scope or var.name in new_syms:
                 raise Redeclared(kind, var.name)
 
             if node.is_final:
@@ -428,20 +593,22 @@ class StaticChecker(ASTVisitor):
 
             if var.init_value:
                 init_sym = self.visit(var.init_value, o)
+                self._const_syms.clear()
                 if not self._are_types_compatible(node.var_type, init_sym.typ):
                     if node.is_final:
                         raise TypeMismatchInConstant(node)
                     else:
                         raise TypeMismatchInStatement(node)
 
-            current_scope = [Symbol(var.name, node.var_type, node.is_final)] + current_scope
+            new_syms[var.name] = Symbol(var.name, node.var_type, node.is_final)
 
+        current_scope.update(new_syms)
         return current_scope
 
     def visit_variable(self, node: "Variable", o: Any = None):
         pass
 
-    def visit_assignment_statement(self, node: "AssignmentStatement", o: list[list[Symbol]] = None) -> list[Symbol]:
+    def visit_assignment_statement(self, node: "AssignmentStatement", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         lhs_symbol = self.visit(node.lhs, o)
         rhs_symbol = self.visit(node.rhs, o)
 
@@ -457,30 +624,30 @@ class StaticChecker(ASTVisitor):
         return o[0]
 
     def visit_if_statement(self, node: "IfStatement", o: Any = None):
-        condition_symbol = self.visit(node.condition, o)
-        if not isinstance(condition_symbol.typ, PrimitiveType) or condition_symbol.typ.type_name != "boolean":
-            raise TypeMismatchInStatement(node)
+        # Điều kiện là literal true/false thì đã biết kiểu, không cần visit
+        if node.condition.__class__ is not BoolLiteral:
+            condition_symbol = self.visit(node.condition, o)
+            if not _is_prim(condition_symbol.typ, "boolean"):
+                raise TypeMismatchInStatement(node)
 
         self.visit(node.then_stmt, o)
 
         if node.else_stmt:
             self.visit(node.else_stmt, o)
 
-    def visit_for_statement(self, node: "ForStatement", o: list[list[Symbol]] = None) -> list[Symbol]:
-        start_symbol = self.visit(node.start_expr, o)
-        end_symbol = self.visit(node.end_expr, o)
+    def visit_for_statement(self, node: "ForStatement", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
+        # Cận là literal nguyên thì đã biết kiểu int, không cần visit
+        start_type = _INT if node.start_expr.__class__ is IntLiteral else self.visit(node.start_expr, o).typ
+        end_type = _INT if node.end_expr.__class__ is IntLiteral else self.visit(node.end_expr, o).typ
 
-        if (not isinstance(start_symbol.typ, PrimitiveType) or start_symbol.typ.type_name != "int" or
-                not isinstance(end_symbol.typ, PrimitiveType) or end_symbol.typ.type_name != "int"):
+        if not _is_prim(start_type, "int") or not _is_prim(end_type, "int"):
             raise TypeMismatchInStatement(node)
 
-        var_found = reduce(
-            lambda found_so_far, scope: found_so_far or next(filter(lambda sym: sym.name == node.variable, scope),
-                                                             None), o, None)
+        var_found = self._lookup(node.variable, o)
 
         # Note: If undeclared, it should have been caught elsewhere, but for TypeMismatch checks:
         if var_found:
-            if not isinstance(var_found.typ, PrimitiveType) or var_found.typ.type_name != "int":
+            if not _is_prim(var_found.typ, "int"):
                 raise TypeMismatchInStatement(node)
 
         if self.current_class:
@@ -495,12 +662,12 @@ class StaticChecker(ASTVisitor):
         self.loop -= 1
         return o[0]
 
-    def visit_break_statement(self, node: "BreakStatement", o: list[list[Symbol]] = None) -> list[Symbol]:
+    def visit_break_statement(self, node: "BreakStatement", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         if self.loop == 0:
             raise MustInLoop(node)
         return o[0]
 
-    def visit_continue_statement(self, node: "ContinueStatement", o: list[list[Symbol]] = None) -> list[Symbol]:
+    def visit_continue_statement(self, node: "ContinueStatement", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
         if self.loop == 0:
             raise MustInLoop(node)
         return o[0]
@@ -531,33 +698,31 @@ class StaticChecker(ASTVisitor):
                 # (Thêm logic cho ArrayType nếu cần)
         return o[0]
 
-    def visit_id_lhs(self, node: "IdLHS", o: list[list[Symbol]] = None) -> Type:
+    def visit_id_lhs(self, node: "IdLHS", o: list[dict[str, Symbol]] = None) -> Type:
         # find in all scopes
         # found = next((sym for scope in o for sym in scope if sym.name == node.name), None)
 
-        # Here: wtf ??!!!
-        found = reduce(
-            lambda found_so_far, scope: found_so_far or next(filter(lambda sym: sym.name == node.name, scope), None), o,
-            None)
+        found = self._lookup(node.name, o)
         if not found:
             raise UndeclaredIdentifier(node.name)
 
         return found
 
-    def visit_identifier(self, node: "Identifier", o: list[list[Symbol]] = None) -> list[Symbol]:
-        found = reduce(
-            lambda found_so_far, scope: found_so_far or next(filter(lambda sym: sym.name == node.name, scope), None), o,
-            None)
+    def visit_identifier(self, node: "Identifier", o: list[dict[str, Symbol]] = None) -> dict[str, Symbol]:
+        found = self._const_syms.pop(id(node), None)
+        if found is not None:
+            return found
+        found = self._lookup(node.name, o)
 
         if not found:
-            class_found = next(filter(lambda cls: cls.name == node.name, self.list_class), None)
+            class_found = self.class_by_name.get(node.name)
             if class_found:
-                return Symbol(node.name, ClassType(node.name))
+                return Symbol(node.name, self._class_type(node.name))
             raise UndeclaredIdentifier(node.name)
 
         return found
 
-    # def visit_postfix_expression(self, node: "PostfixExpression", o: list[list[Symbol]] = None) -> Type:
+    # def visit_postfix_expression(self, node: "PostfixExpression", o: list[dict[str, Symbol]] = None) -> Type:
     #     if not node.postfix_ops:
     #         obj = self.visit(node.primary, o)
     #         return obj if isinstance(obj, Symbol) else Symbol("", obj)
@@ -713,14 +878,17 @@ class StaticChecker(ASTVisitor):
     #         return Symbol("", obj_type)
 
     #     return final_member_symbol
-    def visit_postfix_expression(self, node: "PostfixExpression", o: list[list[Symbol]] = None) -> Type:
+    def visit_postfix_expression(self, node: "PostfixExpression", o: list[dict[str, Symbol]] = None) -> Type:
+        cached = self._const_syms.pop(id(node), None)
+        if cached is not None:
+            return cached
         if not node.postfix_ops:
             obj = self.visit(node.primary, o)
             return obj if isinstance(obj, Symbol) else Symbol("", obj)
 
         # Xác định ngữ cảnh truy cập: static (A.foo) hay instance (a.foo)
         is_static_access = (isinstance(node.primary, Identifier) and
-                            any(cls.name == node.primary.name for cls in self.list_class))
+                            node.primary.name in self.class_by_name)
 
         obj_type_or_symbol = self.visit(node.primary, o)
 
@@ -731,157 +899,107 @@ class StaticChecker(ASTVisitor):
 
         final_member_symbol = None
 
+        handlers = self._postfix_handlers
         for op in node.postfix_ops:
-            # FIX: Add ArrayAccess handling - test061
-            if isinstance(op, ArrayAccess):
-                if not isinstance(obj_type, ArrayType):
-                    raise TypeMismatchInExpression(node)
+            obj_type, final_member_symbol = handlers[op.__class__](
+                node, op, obj_type, final_member_symbol, o, is_static_access)
 
-                idx_sym = self.visit(op.index, o)
-                if not isinstance(idx_sym.typ, PrimitiveType) or idx_sym.typ.type_name != "int":
-                    raise TypeMismatchInExpression(node)
+        if node.postfix_ops[-1].__class__ is MethodCall:
+            return Symbol("", obj_type)
+        return final_member_symbol
 
-                obj_type = obj_type.element_type
-                final_member_symbol = Symbol("", obj_type)
-                continue
+    def _postfix_array_access(self, node, op: ArrayAccess, obj_type, final_member_symbol, o, is_static_access):
+        # FIX: Add ArrayAccess handling - test061
+        if not isinstance(obj_type, ArrayType):
+            raise TypeMismatchInExpression(node)
 
-            if not isinstance(obj_type, ClassType):
-                raise TypeMismatchInExpression(node)
+        idx_sym = self.visit(op.index, o)
+        if not _is_prim(idx_sym.typ, "int"):
+            raise TypeMismatchInExpression(node)
 
-            class_name = obj_type.class_name
-
-            # --- XỬ LÝ LỚP IO (Giữ nguyên logic cũ) ---
-            if class_name == "io":
-                if not isinstance(op, MethodCall):
-                    raise IllegalMemberAccess(node)
-
-                method_name = op.method_name
-                arg_symbols = list(map(lambda arg: self.visit(arg, o), op.args))
-                arg_types = list(map(lambda sym: sym.typ, arg_symbols))
-
-                io_api = {
-                    "readInt": ([], PrimitiveType("int")),
-                    "writeInt": ([PrimitiveType("int")], PrimitiveType("void")),
-                    "writeIntLn": ([PrimitiveType("int")], PrimitiveType("void")),
-                    "readFloat": ([], PrimitiveType("float")),
-                    "writeFloat": ([PrimitiveType("float")], PrimitiveType("void")),
-                    "writeFloatLn": ([PrimitiveType("float")], PrimitiveType("void")),
-                    "readBool": ([], PrimitiveType("boolean")),
-                    "writeBool": ([PrimitiveType("boolean")], PrimitiveType("void")),
-                    "writeBoolLn": ([PrimitiveType("boolean")], PrimitiveType("void")),
-                    "readStr": ([], PrimitiveType("string")),
-                    "writeStr": ([PrimitiveType("string")], PrimitiveType("void")),
-                    "writeStrLn": ([PrimitiveType("string")], PrimitiveType("void")),
-                }
-
-                if method_name not in io_api:
-                    raise UndeclaredMethod(method_name)
-
-                expected_params, return_type = io_api[method_name]
-                if len(arg_types) != len(expected_params):
-                    raise TypeMismatchInExpression(node)
-                if len(expected_params) > 0:
-                    if not self._are_types_compatible(expected_params[0], arg_types[0]):
-                        raise TypeMismatchInExpression(node)
+        element_type = obj_type.element_type
+        return element_type, Symbol("", element_type)
 
-                obj_type = return_type
-                continue
+    def _postfix_class_index(self, node, obj_type) -> ClassIndex:
+        # Lớp của đối tượng đứng trước toán tử truy cập thành viên
+        if not isinstance(obj_type, ClassType):
+            raise TypeMismatchInExpression(node)
 
-                # --- XỬ LÝ LỚP THƯỜNG ---
-            class_decl = next(filter(lambda cls: cls.name == class_name, self.list_class), None)
-            if not class_decl:
-                raise UndeclaredClass(class_name)
-
-            # Attribute access
-            if isinstance(op, MemberAccess):
-                member_name = op.member_name
-                found_attr_symbol = None
-
-                # --- LOGIC MỚI: DUYỆT LÊN CÁC LỚP CHA ĐỂ TÌM ATTRIBUTE ---
-                current_class = class_decl
-                while current_class:
-                    for member in current_class.members:
-                        if isinstance(member, AttributeDecl):
-                            if any(attr.name == member_name for attr in member.attributes):
-                                found_attr_symbol = Symbol(member_name, member.attr_type, member.is_final,
-                                                           member.is_static)
-                                break
-                    if found_attr_symbol:
-                        break
-                    # Leo lên cha
-                    if current_class.superclass:
-                        current_class = next(filter(lambda cls: cls.name == current_class.superclass, self.list_class),
-                                             None)
-                    else:
-                        current_class = None
-                # ---------------------------------------------------------
-
-                if not found_attr_symbol:
-                    raise UndeclaredAttribute(member_name)
-
-                if is_static_access and not found_attr_symbol.isStatic:
-                    raise IllegalMemberAccess(node)
-                if not is_static_access and found_attr_symbol.isStatic and not isinstance(node.primary, ThisExpression):
-                    raise IllegalMemberAccess(node)
-
-                final_member_symbol = found_attr_symbol
-                obj_type = final_member_symbol.typ
-
-            # Method calls
-            elif isinstance(op, MethodCall):
-                method_name = op.method_name
-                found_method = None
-
-                # --- LOGIC MỚI: DUYỆT LÊN CÁC LỚP CHA ĐỂ TÌM METHOD ---
-                current_class = class_decl
-                while current_class:
-                    found_method = next(
-                        filter(lambda m: isinstance(m, MethodDecl) and m.name == method_name, current_class.members),
-                        None)
-                    if found_method:
-                        break
-                    # Leo lên cha
-                    if current_class.superclass:
-                        current_class = next(filter(lambda cls: cls.name == current_class.superclass, self.list_class),
-                                             None)
-                    else:
-                        current_class = None
-                        # -----------------------------------------------------
+        class_name = obj_type.class_name
+        if class_name not in self.class_by_name:
+            raise UndeclaredClass(class_name)
+        return self._class_index[class_name]
+
+    def _postfix_member_access(self, node, op: MemberAccess, obj_type, final_member_symbol, o, is_static_access):
+        if isinstance(obj_type, ClassType) and obj_type.class_name == "io":
+            # io không có thuộc tính, chỉ có phương thức
+            raise IllegalMemberAccess(node)
 
-                if not found_method:
-                    raise UndeclaredMethod(method_name)
+        member_name = op.member_name
 
-                param_types = list(map(lambda p: p.param_type, found_method.params))
-                arg_symbols = [self.visit(arg, o) for arg in op.args]
-                arg_types = [sym.typ for sym in arg_symbols]
+        # Bảng attribute của lớp đã gộp sẵn các lớp cha
+        found_attr_symbol = self._postfix_class_index(node, obj_type).attrs.get(member_name)
 
-                if len(param_types) != len(arg_types):
+        if not found_attr_symbol:
+            raise UndeclaredAttribute(member_name)
+
+        if is_static_access and not found_attr_symbol.isStatic:
+            raise IllegalMemberAccess(node)
+        if not is_static_access and found_attr_symbol.isStatic and not isinstance(node.primary, ThisExpression):
+            raise IllegalMemberAccess(node)
+
+        return found_attr_symbol.typ, found_attr_symbol
+
+    def _postfix_method_call(self, node, op: MethodCall, obj_type, final_member_symbol, o, is_static_access):
+        visit = self.visit
+        compat = self._are_types_compatible
+        method_name = op.method_name
+
+        # --- XỬ LÝ LỚP IO ---
+        if isinstance(obj_type, ClassType) and obj_type.class_name == "io":
+            arg_types = [visit(arg, o).typ for arg in op.args]
+
+            if method_name not in _IO_API:
+                raise UndeclaredMethod(method_name)
+
+            expected_params, return_type = _IO_API[method_name]
+            if len(arg_types) != len(expected_params):
+                raise TypeMismatchInExpression(node)
+            if len(expected_params) > 0:
+                if not compat(expected_params[0], arg_types[0]):
                     raise TypeMismatchInExpression(node)
 
-                for param_t, arg_t in zip(param_types, arg_types):
-                    if not self._are_types_compatible(param_t, arg_t):
-                        raise TypeMismatchInExpression(node)
+            return return_type, final_member_symbol
 
-                if is_static_access and not found_method.is_static:
-                    raise IllegalMemberAccess(node)
-                if not is_static_access and found_method.is_static:
-                    raise IllegalMemberAccess(node)
+        # --- XỬ LÝ LỚP THƯỜNG ---
+        # Bảng method của lớp đã gộp sẵn các lớp cha
+        index = self._postfix_class_index(node, obj_type)
+        overloads = index.methods.get(method_name)
+        found_method = overloads[0] if overloads else None
 
-                method_type = FunctionType([p.param_type for p in found_method.params], found_method.return_type)
-                final_member_symbol = Symbol(method_name, method_type, isStatic=found_method.is_static)
-                obj_type = final_member_symbol.typ.return_type
+        if not found_method:
+            raise UndeclaredMethod(method_name)
 
-        last_op = node.postfix_ops[-1]
+        method_symbol = index.method_symbols[method_name]
+        param_types = method_symbol.typ.param_types
+        arg_types = [visit(arg, o).typ for arg in op.args]
 
-        if isinstance(last_op, MemberAccess):
-            return final_member_symbol
-        elif isinstance(last_op, MethodCall):
-            return Symbol("", obj_type)
+        if len(param_types) != len(arg_types):
+            raise TypeMismatchInExpression(node)
 
-        return final_member_symbol
+        for param_t, arg_t in zip(param_types, arg_types):
+            if not compat(param_t, arg_t):
+                raise TypeMismatchInExpression(node)
+
+        if is_static_access and not found_method.is_static:
+            raise IllegalMemberAccess(node)
+        if not is_static_access and found_method.is_static:
+            raise IllegalMemberAccess(node)
 
-    def visit_method_invocation_statement(self, node: "MethodInvocationStatement", o: list[list[Symbol]] = None) -> \
-    list[Symbol]:
+        return method_symbol.typ.return_type, method_symbol
+
+    def visit_method_invocation_statement(self, node: "MethodInvocationStatement", o: list[dict[str, Symbol]] = None) -> \
+    dict[str, Symbol]:
         try:
             # Sửa ở đây: node.method_call
             self.visit(node.method_call, o)
@@ -889,7 +1007,7 @@ class StaticChecker(ASTVisitor):
             raise TypeMismatchInStatement(node)
         return o[0]
 
-    def visit_postfix_lhs(self, node: "PostfixLHS", o: list[list[Symbol]] = None) -> Symbol:
+    def visit_postfix_lhs(self, node: "PostfixLHS", o: list[dict[str, Symbol]] = None) -> Symbol:
         try:
             return self.visit(node.postfix_expr, o)
         except IllegalMemberAccess:
@@ -901,13 +1019,14 @@ class StaticChecker(ASTVisitor):
     def visit_member_access(self, node: "MemberAccess", o: Any = None):
         pass
 
-    def visit_this_expression(self, node: "ThisExpression", o: list[list[Symbol]] = None) -> ClassType:
-        if self.in_static_method:
+    def visit_this_expression(self, node: "ThisExpression", o: list[dict[str, Symbol]] = None) -> ClassType:
+        method = self.current_method
+        if method is not None and method.is_static:
             raise UndeclaredIdentifier("this")
             # Sử dụng current_class nếu có, fallback về logic cũ nếu cần
         if self.current_class:
-            return ClassType(self.current_class.name)
-        return ClassType(self.list_class[len(o[-1]) - 1].name)
+            return self._class_type(self.current_class.name)
+        return self._class_type(self.list_class[len(o[-1]) - 1].name)
 
     ##! -------------- Task 2 --------------
     def visit_parenthesized_expression(
@@ -918,14 +1037,17 @@ class StaticChecker(ASTVisitor):
     def visit_object_creation(self, node: "ObjectCreation", o: Any = None) -> Symbol:
         # 1. Tìm ClassDecl của lớp đang được tạo
         class_name = node.class_name
-        class_decl = next(filter(lambda cls: cls.name == class_name, self.list_class), None)
+        class_decl = self.class_by_name.get(class_name)
 
         if not class_decl:
             raise UndeclaredClass(class_name)
 
+        # Biến cục bộ cho các thuộc tính dùng trong vòng lặp
+        visit = self.visit
+        compat = self._are_types_compatible
+
         # 2. Lấy kiểu của các đối số (arguments) được truyền vào
-        arg_symbols = [self.visit(arg, o) for arg in node.args]
-        arg_types = [sym.typ for sym in arg_symbols]
+        arg_types = [visit(arg, o).typ for arg in node.args]
 
         # 3. Tìm tất cả các constructor trong lớp đó
         constructors = [mem for mem in class_decl.members if isinstance(mem, ConstructorDecl)]
@@ -944,7 +1066,7 @@ class StaticChecker(ASTVisitor):
                 if len(param_types) != len(arg_types):
                     continue
 
-                if all(self._are_types_compatible(param, arg) for param, arg in zip(param_types, arg_types)):
+                if all(compat(param, arg) for param, arg in zip(param_types, arg_types)):
                     found_constructor = True
                     break
 
@@ -953,7 +1075,7 @@ class StaticChecker(ASTVisitor):
             raise TypeMismatchInExpression(node)
 
         # 6. Nếu hợp lệ, trả về một Symbol đại diện cho đối tượng mới
-        return Symbol(class_name, ClassType(class_name))
+        return Symbol(class_name, self._class_type(class_name))
 
     def visit_primitive_type(self, node: "PrimitiveType", o: Any = None):
         pass
@@ -972,80 +1094,72 @@ class StaticChecker(ASTVisitor):
         right_sym = self.visit(node.right, o)
         left_type = left_sym.typ
         right_type = right_sym.typ
-        op = node.operator
 
-        # Phép toán số học: +, -, *, /
-        if op in ['+', '-', '*', '/']:
-            if not (isinstance(left_type, PrimitiveType) and left_type.type_name in ["int", "float"] and
-                    isinstance(right_type, PrimitiveType) and right_type.type_name in ["int", "float"]):
-                raise TypeMismatchInExpression(node)
-            if left_type.type_name == "float" or right_type.type_name == "float":
-                return Symbol("", PrimitiveType("float"))
-            return Symbol("", PrimitiveType("int"))
-
-        # Phép toán % và \ (chỉ cho int)
-        elif op == "%":
-            if not (isinstance(left_type, PrimitiveType) and left_type.type_name == "int" and
-                    isinstance(right_type, PrimitiveType) and right_type.type_name == "int"):
-                raise TypeMismatchInExpression(node)
-            return Symbol("", PrimitiveType("int"))
+        # Mã kiểu nguyên thủy: 0 int, 1 float, 2 boolean, 3 string, 4 kiểu khác
+        lc = getattr(left_type, "_code", _CODE_OTHER)
+        rc = getattr(right_type, "_code", _CODE_OTHER)
 
-        elif op == '^':
-            if not (isinstance(left_type, PrimitiveType) and left_type.type_name == "string" and
-                    isinstance(right_type, PrimitiveType) and right_type.type_name == "string"):
-                raise TypeMismatchInExpression(node)
-            return Symbol("", PrimitiveType("string"))
-
-        # Relational Operators (==, !=, <, >, <=, >=)
-        elif op in ['==', '!=', '<', '>', '<=', '>=']:
-            # Check type compatibility
-            valid = False
-
-            # For strict equality/inequality, usually types must be compatible
-            if op in ['==', '!=']:
-                # Example rule: Types must be same or coercible
-                # Usually checking simple compatibility is enough,
-                # or specifically allowing int/float mix and boolean/boolean
-                if self._are_types_compatible(left_type, right_type) or self._are_types_compatible(right_type,
-                                                                                                   left_type):
-                    valid = True
-                # Also allow int/float comparisons specifically if not covered by compatible
-                if (isinstance(left_type, PrimitiveType) and left_type.type_name in ['int', 'float'] and
-                        isinstance(right_type, PrimitiveType) and right_type.type_name in ['int', 'float']):
-                    valid = True
-
-            # For ordering <, >, <=, >=, usually only numeric
-            else:
-                if (isinstance(left_type, PrimitiveType) and left_type.type_name in ['int', 'float'] and
-                        isinstance(right_type, PrimitiveType) and right_type.type_name in ['int', 'float']):
-                    valid = True
+        handler = self._binop_handlers.get(node.operator)
+        if handler is None:
+            return _SYM_BOOL
+        return handler(node, lc, rc, left_type, right_type)
 
-            if not valid:
-                raise TypeMismatchInExpression(node)
-            return Symbol("", PrimitiveType("boolean"))
+    # Phép toán số học: +, -, *, /
+    def _binop_arith(self, node, lc, rc, left_type, right_type) -> Symbol:
+        if lc > _CODE_FLOAT or rc > _CODE_FLOAT:
+            raise TypeMismatchInExpression(node)
+        if lc == _CODE_FLOAT or rc == _CODE_FLOAT:
+            return _SYM_FLOAT
+        return _SYM_INT
 
-        # Boolean Operators (&&, ||)
-        elif op in ['&&', '||']:
-            if not (isinstance(left_type, PrimitiveType) and left_type.type_name == "boolean" and
-                    isinstance(right_type, PrimitiveType) and right_type.type_name == "boolean"):
-                raise TypeMismatchInExpression(node)
-            return Symbol("", PrimitiveType("boolean"))
-        return Symbol("", PrimitiveType("boolean"))
+    # Phép toán % và \ (chỉ cho int)
+    def _binop_mod(self, node, lc, rc, left_type, right_type) -> Symbol:
+        if lc != _CODE_INT or rc != _CODE_INT:
+            raise TypeMismatchInExpression(node)
+        return _SYM_INT
+
+    def _binop_concat(self, node, lc, rc, left_type, right_type) -> Symbol:
+        if lc != _CODE_STR or rc != _CODE_STR:
+            raise TypeMismatchInExpression(node)
+        return _SYM_STR
+
+    # Relational Operators (==, !=)
+    def _binop_equality(self, node, lc, rc, left_type, right_type) -> Symbol:
+        # Types must be same or coercible; int/float mix is always allowed
+        if lc <= _CODE_FLOAT and rc <= _CODE_FLOAT:
+            return _SYM_BOOL
+        compat = self._are_types_compatible
+        if compat(left_type, right_type) or compat(right_type, left_type):
+            return _SYM_BOOL
+        raise TypeMismatchInExpression(node)
+
+    # Relational Operators (<, >, <=, >=): chỉ cho kiểu số
+    def _binop_ordering(self, node, lc, rc, left_type, right_type) -> Symbol:
+        if lc > _CODE_FLOAT or rc > _CODE_FLOAT:
+            raise TypeMismatchInExpression(node)
+        return _SYM_BOOL
+
+    # Boolean Operators (&&, ||)
+    def _binop_logical(self, node, lc, rc, left_type, right_type) -> Symbol:
+        if lc != _CODE_BOOL or rc != _CODE_BOOL:
+            raise TypeMismatchInExpression(node)
+        return _SYM_BOOL
 
     def visit_unary_op(self, node: "UnaryOp", o: Any = None) -> Symbol:
         operand_sym = self.visit(node.operand, o)
         operand_type = operand_sym.typ
         op = node.operator
+        code = getattr(operand_type, "_code", _CODE_OTHER)
 
         if op == '-':
-            if not (isinstance(operand_type, PrimitiveType) and operand_type.type_name in ["int", "float"]):
+            if code > _CODE_FLOAT:
                 raise TypeMismatchInExpression(node)
-            return Symbol("", operand_type)  # Return int or float depending on input
+            return _SYM_FLOAT if code == _CODE_FLOAT else _SYM_INT  # int or float depending on input
 
         elif op == '!':
-            if not (isinstance(operand_type, PrimitiveType) and operand_type.type_name == "boolean"):
+            if code != _CODE_BOOL:
                 raise TypeMismatchInExpression(node)
-            return Symbol("", PrimitiveType("boolean"))
+            return _SYM_BOOL
 
         return Symbol("", operand_type)
 
@@ -1054,31 +1168,41 @@ class StaticChecker(ASTVisitor):
 
     # Primtive type
     def visit_int_literal(self, node: "IntLiteral", o: Any = None):
-        return Symbol("", PrimitiveType("int"))
+        return _SYM_INT
 
     def visit_float_literal(self, node: "FloatLiteral", o: Any = None):
-        return Symbol("", PrimitiveType("float"))
+        return _SYM_FLOAT
 
     def visit_bool_literal(self, node: "BoolLiteral", o: Any = None):
-        return Symbol("", PrimitiveType("boolean"))
+        return _SYM_BOOL
 
     def visit_string_literal(self, node: "StringLiteral", o: Any = None):
-        return Symbol("", PrimitiveType("string"))
+        return _SYM_STR
 
     def visit_array_literal(self, node: "ArrayLiteral", o: Any = None):
         if not node.value:
-            return Symbol("", ArrayType(PrimitiveType("unknown"), 0))
+            return _SYM_EMPTY_ARRAY
 
         # Type of array = type of first element
-        element_symbols = [self.visit(elem, o) for elem in node.value]
-        array_type = element_symbols[0].typ
-
-        for current_sym in element_symbols[1:]:
-            if type(array_type) is not type(current_sym.typ) or \
-                    (isinstance(array_type, PrimitiveType) and array_type.type_name != current_sym.typ.type_name):
-                raise IllegalArrayLiteral(node)
+        visit = self.visit
+        elements = iter(node.value)
+        array_type = visit(next(elements), o).typ
+        array_cls = array_type.__class__
+        is_prim = array_cls is PrimitiveType
+
+        # Visit hết các phần tử trước khi báo lỗi, để lỗi trong phần tử vẫn được ưu tiên
+        mismatch = False
+        for elem in elements:
+            typ = visit(elem, o).typ
+            # Kiểu nguyên thủy được intern nên phần lớn trường hợp khớp ngay bằng `is`
+            if typ is array_type:
+                continue
+            if typ.__class__ is not array_cls or (is_prim and array_type.type_name != typ.type_name):
+                mismatch = True
+        if mismatch:
+            raise IllegalArrayLiteral(node)
 
         return Symbol("", ArrayType(array_type, len(node.value)))
 
     def visit_nil_literal(self, node: "NilLiteral", o: Any = None):
-        return Symbol("", PrimitiveType("nil"))
\ No newline at end of file
+        return _SYM_NIL
\ No newline at end of file
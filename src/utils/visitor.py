@@ -4,19 +4,45 @@ This module defines the abstract visitor pattern interface for traversing
 and processing AST nodes.
 """
 
+import re
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     from .nodes import *
 
 
+@lru_cache(maxsize=None)
+def _visit_method_name(node_cls: type) -> str:
+    """Visitor method name for a node class, e.g. PostfixExpression -> visit_postfix_expression."""
+    return "visit_" + re.sub(r"(?<=[a-z])(?=[A-Z])", "_", node_cls.__name__).lower()
+
+
 class ASTVisitor(ABC):
     """Abstract base class for AST visitors."""
 
+    # node class -> visit_* function; each visitor subclass gets its own table
+    _dispatch_cache: dict = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch_cache = {}
+
     def visit(self, node: "ASTNode", o: Any = None):
-        """Visit a node using the visitor pattern."""
-        return node.accept(self, o)
+        """Visit a node using the visitor pattern.
+
+        The visit_* function for each node class is resolved once per visitor
+        class and cached, so dispatch is a single dict lookup instead of
+        node.accept() bouncing back into the visitor.
+        """
+        fn = self._dispatch_cache.get(node.__class__)
+        if fn is None:
+            fn = getattr(type(self), _visit_method_name(node.__class__), None)
+            if fn is None:
+                return node.accept(self, o)
+            self._dispatch_cache[node.__class__] = fn
+        return fn(self, node, o)
 
     # Program and class declarations
     @abstractmethod
@@ -126,3 +126,13 @@ def test_011():
     }"""
     expected = "Program([ClassDecl(TestClass, [DestructorDecl(~TestClass(), BlockStatement(vars=[VariableDecl(PrimitiveType(int), [Variable(x = IntLiteral(0))])], stmts=[]))])])"
     assert str(ASTGenerator(source).generate()) == expected
+
+
+def test_012():
+    """Test parameter group sharing one type AST generation"""
+    source = """class TestClass {
+        void set(int a, b; float c) {
+        }
+    }"""
+    expected = "Program([ClassDecl(TestClass, [MethodDecl(PrimitiveType(void) set([Parameter(PrimitiveType(int) a), Parameter(PrimitiveType(int) b), Parameter(PrimitiveType(float) c)]), BlockStatement(stmts=[]))])])"
+    assert str(ASTGenerator(source).generate()) == expected
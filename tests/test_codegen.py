@@ -4,8 +4,11 @@ This file contains test cases for the code generator.
 Students should add more test cases here.
 """
 
+import pytest
+
+from src.codegen.error import IllegalRuntimeException
 from src.utils.nodes import *
-from utils import CodeGenerator
+from utils import ASTGenerator, CodeGenerator
 
 
 def test_001():
@@ -71,6 +74,152 @@ def test_002():
     assert result == expected, f"Expected '{expected}', got '{result}'"
 
 
+def test_003():
+    """For loop bound is evaluated once, even when the body changes the bound variable"""
+    ast = ASTGenerator("""
+class Main {
+    static void main() {
+        int n := 3;
+        int i;
+        for i := 1 to n do {
+            n := n - 1;
+            io.writeInt(i);
+        }
+    }
+}
+""").generate()
+    code = CodeGenerator().generate_jasmin(ast)["Main"]
+    # n (local 1) is copied once into a scratch local before the loop label;
+    # the test inside the loop reads the copy, not n
+    assert "\tiload_1\n\tistore_3\nLabel2:\n\tiload_2\n\tiload_3\n\tif_icmpgt Label4\n" in code, code
+
+
+def test_004():
+    """Break outside a loop is reported instead of jumping to a bogus label"""
+    ast = ASTGenerator("""
+class Main {
+    static void main() {
+        break;
+    }
+}
+""").generate()
+    with pytest.raises(IllegalRuntimeException) as error:
+        CodeGenerator().generate_jasmin(ast)
+    assert str(error.value) == "Illegal Runtime: None break label\n"
+
+
+def test_005():
+    """io.writeIntLn on a folded int expression: no receiver is pushed for io"""
+    ast = ASTGenerator("""
+class Main {
+    static void main() {
+        io.writeIntLn(1 + 2 * 3);
+    }
+}
+""").generate()
+    code = CodeGenerator().generate_jasmin(ast)["Main"]
+    assert "Label0:\n\tbipush 7\n\tinvokestatic io/writeIntLn(I)V\n\treturn\n" in code, code
+    expected = "7"
+    result = CodeGenerator().generate_and_run(ast)
+    assert result == expected, f"Expected '{expected}', got '{result}'"
+
+
+def test_006():
+    """Chained instance calls a.f().g(): each call uses the result to its left as receiver"""
+    ast = ASTGenerator("""
+class A {
+    A f() { return this; }
+    int g() { return 7; }
+}
+class Main {
+    static void main() {
+        A a := new A();
+        io.writeIntLn(a.f().g());
+    }
+}
+""").generate()
+    code = CodeGenerator().generate_jasmin(ast)["Main"]
+    assert ("\taload_1\n\tinvokevirtual A/f()LA;\n\tinvokevirtual A/g()I\n"
+            "\tinvokestatic io/writeIntLn(I)V\n") in code, code
+
+
+def test_007():
+    """Folded \\ and % truncate toward zero like idiv/irem"""
+    ast = ASTGenerator("""
+class Main {
+    static void main() {
+        io.writeIntLn(-7 \\ 2);
+        io.writeIntLn(-7 % 2);
+        io.writeIntLn(7 % -2);
+    }
+}
+""").generate()
+    code = CodeGenerator().generate_jasmin(ast)["Main"]
+    assert "idiv" not in code and "irem" not in code, code
+    assert ("\tbipush -3\n\tinvokestatic io/writeIntLn(I)V\n"
+            "\ticonst_m1\n\tinvokestatic io/writeIntLn(I)V\n"
+            "\ticonst_1\n\tinvokestatic io/writeIntLn(I)V\n") in code, code
+    expected = "-3\n-1\n1"
+    result = CodeGenerator().generate_and_run(ast)
+    assert result == expected, f"Expected '{expected}', got '{result}'"
+
+
+def test_008():
+    """Downto loop with a literal bound: the bound is pushed on each test, the counter steps with iinc"""
+    ast = ASTGenerator("""
+class Main {
+    static void main() {
+        int i;
+        for i := 3 downto 1 do
+            io.writeInt(i);
+    }
+}
+""").generate()
+    code = CodeGenerator().generate_jasmin(ast)["Main"]
+    assert "\tiload_1\n\ticonst_1\n\tif_icmplt " in code, code
+    assert "\tiinc 1 -1\n" in code, code
+    expected = "321"
+    result = CodeGenerator().generate_and_run(ast)
+    assert result == expected, f"Expected '{expected}', got '{result}'"
+
+
+def test_009():
+    """The class with the JVM main method is recorded, not just the first class"""
+    ast = ASTGenerator("""
+class Helper {
+    int get() { return 1; }
+}
+class Main {
+    static void main() {
+        io.writeInt(2);
+    }
+}
+""").generate()
+    generator = CodeGenerator()
+    code = generator.generate_jasmin(ast)
+    assert sorted(code) == ["Helper", "Main"]
+    assert generator.main_class == "Main"
+
+
+def test_010():
+    """A loop whose body lowers the bound variable still runs to the original bound"""
+    ast = ASTGenerator("""
+class Main {
+    static void main() {
+        int n := 3;
+        int i;
+        for i := 1 to n do {
+            n := n - 1;
+            io.writeInt(i);
+        }
+    }
+}
+""").generate()
+    expected = "123"
+    result = CodeGenerator().generate_and_run(ast)
+    assert result == expected, f"Expected '{expected}', got '{result}'"
+
+
 # TODO: Add more test cases here
 # Students should implement at least 100 test cases covering:
 # - All literal types (int, float, boolean, string, array, nil)
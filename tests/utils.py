@@ -3,10 +3,16 @@ import os
 import subprocess
 import tempfile
 import shutil
-import glob
+from collections import OrderedDict
+from functools import lru_cache
 
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "build"))
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+_ROOT = os.path.dirname(os.path.dirname(__file__))
+_RUNTIME_DIR = os.path.join(_ROOT, "src", "runtime")
+_JASMIN_JAR = os.path.join(_RUNTIME_DIR, "jasmin.jar")
+_IO_CLASS = os.path.join(_RUNTIME_DIR, "io.class")
+
+sys.path.insert(0, os.path.join(_ROOT, "build"))
+sys.path.insert(0, os.path.join(_ROOT, "src"))
 
 from antlr4 import *
 from build.OPLangLexer import OPLangLexer
@@ -22,50 +28,99 @@ class Tokenizer:
         self.input_stream = InputStream(input_string)
         self.lexer = OPLangLexer(self.input_stream)
 
+    def _fill(self):
+        """Lex the whole input into a token stream; returns (tokens, error)."""
+        token_stream = CommonTokenStream(self.lexer)
+        try:
+            token_stream.fill()
+        except Exception as e:
+            return token_stream.tokens, e
+        return token_stream.tokens[:-1], None  # drop EOF
+
     def get_tokens(self):
-        tokens = []
-        token = self.lexer.nextToken()
-        while token.type != Token.EOF:
-            tokens.append(token.text)
-            try:
-                token = self.lexer.nextToken()
-            except Exception as e:
-                tokens.append(str(e))
-                return tokens
-        return tokens + ["EOF"]
+        tokens, error = self._fill()
+        if error is None:
+            return [token.text for token in tokens] + ["EOF"]
+        if not tokens:
+            raise error
+        return [token.text for token in tokens] + [str(error)]
 
     def get_tokens_as_string(self):
-        tokens = []
-        try:
-            while True:
-                token = self.lexer.nextToken()
-                if token.type == Token.EOF:
-                    tokens.append("EOF")
-                    break
-                tokens.append(token.text)
-        except Exception as e:
-            if tokens:  # If we already have some tokens, append error
-                tokens.append(str(e))
-            else:  # If no tokens yet, just return error
-                return str(e)
-        return ",".join(tokens)
+        tokens, error = self._fill()
+        if error is None:
+            return ",".join([token.text for token in tokens] + ["EOF"])
+        if not tokens:  # If no tokens yet, just return error
+            return str(error)
+        return ",".join([token.text for token in tokens] + [str(error)])
+
+
+@lru_cache(maxsize=1024)
+def _sll_program(input_string):
+    """Parse tree from a silent SLL pass, or None if that pass fails.
+
+    Cached per source string, so Parser and ASTGenerator share one tree.
+    """
+    parser = OPLangParser(CommonTokenStream(OPLangLexer(InputStream(input_string))))
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    try:
+        return parser.program()
+    except Exception:
+        return None
+
+
+def _parse_program(input_string, error_listener=None):
+    """Parse with fast SLL prediction first; fall back to full LL on failure.
+
+    Any failure of the SLL pass (syntax or lexer error) reruns the whole parse
+    from a fresh lexer in plain LL mode, so errors are reported exactly as
+    before.
+    """
+    parse_tree = _sll_program(input_string)
+    if parse_tree is not None:
+        return parse_tree
+
+    parser = OPLangParser(CommonTokenStream(OPLangLexer(InputStream(input_string))))
+    if error_listener is not None:
+        parser.removeErrorListeners()
+        parser.addErrorListener(error_listener)
+    return parser.program()
+
+
+# ASTGeneration holds no per-run state, so one instance is reused for every source
+_AST_VISITOR = ASTGeneration()
+
+
+@lru_cache(maxsize=1024)
+def _parse(input_string):
+    """Parse once per source string; the result is shared by every Parser."""
+    try:
+        _parse_program(input_string, NewErrorListener.INSTANCE)  # Assuming 'program' is the entry point of your grammar
+        return "success"
+    except Exception as e:
+        return str(e)
+
+
+@lru_cache(maxsize=1024)
+def _generate_ast(input_string):
+    """Build the AST once per source string; AST nodes are never mutated."""
+    try:
+        # Parse the program starting from the entry point
+        parse_tree = _parse_program(input_string)
+
+        # Generate AST using the visitor
+        return _AST_VISITOR.visit(parse_tree)
+    except Exception as e:
+        return f"AST Generation Error: {str(e)}"
 
 
 class Parser:
     def __init__(self, input_string):
-        self.input_stream = InputStream(input_string)
-        self.lexer = OPLangLexer(self.input_stream)
-        self.token_stream = CommonTokenStream(self.lexer)
-        self.parser = OPLangParser(self.token_stream)
-        self.parser.removeErrorListeners()
-        self.parser.addErrorListener(NewErrorListener.INSTANCE)
+        self.input_string = input_string
 
     def parse(self):
-        try:
-            self.parser.program()  # Assuming 'program' is the entry point of your grammar
-            return "success"
-        except Exception as e:
-            return str(e)
+        return _parse(self.input_string)
 
 
 class ASTGenerator:
@@ -73,32 +128,25 @@ class ASTGenerator:
 
     def __init__(self, input_string):
         self.input_string = input_string
-        self.input_stream = InputStream(input_string)
-        self.lexer = OPLangLexer(self.input_stream)
-        self.token_stream = CommonTokenStream(self.lexer)
-        self.parser = OPLangParser(self.token_stream)
-        self.ast_generator = ASTGeneration()
 
     def generate(self):
         """Generate AST from the input string."""
-        try:
-            # Parse the program starting from the entry point
-            parse_tree = self.parser.program()
-
-            # Generate AST using the visitor
-            ast = self.ast_generator.visit(parse_tree)
-            return ast
-        except Exception as e:
-            return f"AST Generation Error: {str(e)}"
+        return _generate_ast(self.input_string)
 
 
 class Checker:
     """Class to perform static checking on the AST."""
 
+    # StaticChecker resets its per-program state in visit_program, so one
+    # instance is shared by every Checker (created on first use)
+    _static_checker = None
+
     def __init__(self, source=None, ast=None):
         self.source = source
         self.ast = ast
-        self.checker = StaticChecker()
+        if Checker._static_checker is None:
+            Checker._static_checker = StaticChecker()
+        self.checker = Checker._static_checker
 
     def check_from_ast(self):
         """Perform static checking on the AST."""
@@ -121,96 +169,135 @@ class Checker:
             return str(e)
 
 
+@lru_cache(maxsize=None)
+def _node_fields(node_class):
+    """Slots that define a node's content (source positions excluded)."""
+    return tuple(
+        name
+        for klass in reversed(node_class.__mro__)
+        for name in getattr(klass, "__slots__", ())
+        if name not in ("line", "column")
+    )
+
+
+def _ast_key(node):
+    """Structural, hashable fingerprint of an AST.
+
+    A flat pre-order tuple: each node or list contributes its kind and number of
+    children, each other value its type and itself. Built with an explicit stack,
+    so deeply nested expressions cannot hit the recursion limit.
+    """
+    key = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, ASTNode):
+            fields = _node_fields(item.__class__)
+            key.append(item.__class__.__name__)
+            key.append(len(fields))
+            stack.extend(getattr(item, name, None) for name in reversed(fields))
+        elif isinstance(item, (list, tuple)):
+            key.append(list)
+            key.append(len(item))
+            stack.extend(reversed(item))
+        else:
+            key.append(item.__class__.__name__)
+            key.append(item)
+    return tuple(key)
+
+
+# AST fingerprint -> (main class, {class file name: bytes}) of a successful build, least
+# recently used first. Only used by a CodeGenerator(use_cache=True): by default every run
+# goes through the code generator
+_CODEGEN_CACHE = OrderedDict()
+_CODEGEN_CACHE_SIZE = 64
+
+
 class CodeGenerator:
     """Class to generate and run code from AST."""
 
-    def __init__(self):
+    def __init__(self, use_cache=False):
         from src.codegen.codegen import CodeGenerator as CodeGen
-        self.codegen = CodeGen()
-        self.runtime_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src", "runtime")
+        self.codegen_class = CodeGen
+        # True: a program already built by an earlier run is restored instead of regenerated
+        self.use_cache = use_cache
+        self.runtime_dir = _RUNTIME_DIR
+        self.jasmin_jar = _JASMIN_JAR
+
+    def generate_jasmin(self, ast):
+        """Generate code from AST without assembling it (no JVM needed).
+
+        Returns {class name: .j text}; the class given the JVM main method is
+        left in self.main_class.
+        """
+        workdir = tempfile.mkdtemp(prefix="oplang_")
+        try:
+            codegen = self.codegen_class(output_dir=workdir)
+            codegen.visit(ast)
+            self.main_class = codegen.main_class
+            code = {}
+            with os.scandir(workdir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".j"):
+                        with open(entry.path) as file:
+                            code[entry.name[:-2]] = file.read()
+            return code
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
 
     def generate_and_run(self, ast):
         """Generate code from AST and run it, return output"""
+        # Mỗi lần chạy dùng một thư mục tạm riêng: không cần dọn file .j/.class cũ
+        # và không phải đổi thư mục làm việc của tiến trình
+        workdir = tempfile.mkdtemp(prefix="oplang_")
         try:
-            # --- THÊM ĐOẠN NÀY ĐỂ DỌN DẸP ---
-            # Xóa sạch các file .j và .class cũ trước khi chạy test mới
-            for filename in os.listdir(self.runtime_dir):
-                file_path = os.path.join(self.runtime_dir, filename)
-                # Chỉ xóa file .j và .class, TRỪ io.class (thư viện)
-                if filename.endswith(".j") or (filename.endswith(".class") and filename != "io.class"):
-                    try:
-                        os.remove(file_path)
-                    except OSError:
-                        pass
-            # -------------------------------
-
-            # Change to runtime directory and generate code from AST
-            original_dir = os.getcwd()
-            os.chdir(self.runtime_dir)
-            try:
-                self.codegen.visit(ast)
-            finally:
-                os.chdir(original_dir)
-
-            # Find all generated .j files
-            j_files = glob.glob(os.path.join(self.runtime_dir, "*.j"))
+            return self._generate_and_run(ast, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
 
-            if not j_files:
-                return "Error: No .j files generated"
+    def _generate_and_run(self, ast, workdir):
+        try:
+            shutil.copy(_IO_CLASS, workdir)
+
+            key = _ast_key(ast) if self.use_cache else None
+            build = _CODEGEN_CACHE.get(key) if self.use_cache else None
+            if build is None:
+                build = self._build(ast, workdir)
+                if isinstance(build, str):  # Error message; failed builds are not cached
+                    return build
+                if self.use_cache and build[1] is not None:
+                    _CODEGEN_CACHE[key] = build
+                    if len(_CODEGEN_CACHE) > _CODEGEN_CACHE_SIZE:
+                        _CODEGEN_CACHE.popitem(last=False)
+            else:
+                _CODEGEN_CACHE.move_to_end(key)
+                # Same program seen before: restore its classes, skipping codegen and Jasmin
+                for name, data in build[1].items():
+                    with open(os.path.join(workdir, name), "wb") as file:
+                        file.write(data)
+
+            # Find the class with main method
+            # In OPLang, any class can have a static main() method; the code
+            # generator records the class it emitted the JVM main for
+            main_class = build[0]
+
+            if not main_class:
+                return "Error: No main class found"
 
-            # Assemble all .j files to .class
             try:
-                for j_file in j_files:
-                    result = subprocess.run(
-                        ["java", "-jar", "jasmin.jar", os.path.basename(j_file)],
-                        cwd=self.runtime_dir,
-                        capture_output=True,
-                        text=True,
-                        timeout=10
-                    )
-
-                    if result.returncode != 0:
-                        return f"Assembly error for {os.path.basename(j_file)}: {result.stderr}"
-
-                # Find the class with main method
-                # In OPLang, any class can have a static main() method
-                class_files = glob.glob(os.path.join(self.runtime_dir, "*.class"))
-                main_class = None
-
-                # Try to find a class with main method
-                # For now, try running the first class found, or look for a specific pattern
-                # This is a simplified approach - in practice, you might need to check which class has main
-                if class_files:
-                    # Try to find main class by checking class files
-                    # For simplicity, we'll try the first class file
-                    # In a real implementation, you might need to inspect the class files
-                    # or maintain a list of classes with main methods
-
-                    # Get class name from .class file (remove .class extension)
-                    for class_file in class_files:
-                        class_name = os.path.basename(class_file).replace(".class", "")
-                        # Skip io.class
-                        if class_name == "io":
-                            continue
-                        main_class = class_name
-                        break
-
-                if not main_class:
-                    return "Error: No main class found"
-
                 # Run program
                 result = subprocess.run(
                     ["java", main_class],
-                    cwd=self.runtime_dir,
+                    cwd=workdir,
                     capture_output=True,
-                    text=True,
                     timeout=10
                 )
 
+                # Output is captured as bytes and decoded once, only on the branch that uses it
                 if result.returncode != 0:
-                    return f"Runtime error: {result.stderr}"
+                    return f"Runtime error: {result.stderr.decode('utf-8', 'replace')}"
 
-                return result.stdout.strip()
+                return result.stdout.decode("utf-8", "replace").strip()
 
             except subprocess.TimeoutExpired:
                 return "Timeout"
@@ -219,3 +306,51 @@ class CodeGenerator:
 
         except Exception as e:
             return f"Code generation error: {str(e)}"
+
+    def _build(self, ast, workdir):
+        """Generate and assemble the program in workdir.
+
+        Returns (main_class, {class file name: bytes} or None if some class file
+        is missing) or an error message.
+        """
+        # Generate code from AST into the working directory
+        codegen = self.codegen_class(output_dir=workdir)
+        codegen.visit(ast)
+
+        # Find all generated .j files (one directory pass, no fnmatch per entry)
+        with os.scandir(workdir) as entries:
+            j_names = [entry.name for entry in entries if entry.name.endswith(".j")]
+
+        if not j_names:
+            return "Error: No .j files generated"
+
+        # Assemble all .j files to .class in one Jasmin run (one JVM start-up)
+        try:
+            result = subprocess.run(
+                ["java", "-jar", self.jasmin_jar, *j_names],
+                cwd=workdir,
+                capture_output=True,
+                timeout=10 * len(j_names)
+            )
+        except subprocess.TimeoutExpired:
+            return "Timeout"
+        except FileNotFoundError:
+            return "Java not found"
+
+        if result.returncode != 0:
+            # Jasmin prefixes its messages with the file name; report the first one named
+            stderr = result.stderr.decode("utf-8", "replace")
+            failed = next((name for name in j_names if name in stderr), j_names[0])
+            return f"Assembly error for {failed}: {stderr}"
+
+        # Jasmin writes <name>.class for each <name>.j (Jasmin still exits with 0 when a
+        # file has errors, so a missing class just leaves the build uncached)
+        classes = {}
+        for j_name in j_names:
+            class_name = j_name[:-2] + ".class"
+            try:
+                with open(os.path.join(workdir, class_name), "rb") as file:
+                    classes[class_name] = file.read()
+            except FileNotFoundError:
+                return codegen.main_class, None
+        return codegen.main_class, classes